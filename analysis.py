@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from game import Game
+from pieces import Move
+from search import MATE, Searcher, child, evaluate
+
+class MoveScore:
+    """Result of analysing one candidate move: whether it is legal, the status of the game after it, and its score in centipawns for the player making it"""
+    def __init__(self, move: Move, legal: bool, status: str = "", score: int = 0) -> None:
+        self.move = move
+        self.legal = legal
+        self.status = status # checkmate, stalemate, or empty if the game continues
+        self.score = score
+
+    def __repr__(self) -> str:
+        """Return string representation of MoveScore"""
+        return f"MoveScore({self.move!r}, legal={self.legal}, status={self.status!r}, score={self.score})"
+
+def _sameMove(a: Move, b: Move) -> bool:
+    """Return True if a and b pass through the same spaces with the same special move flags"""
+    return (a.spaces, a.castle, a.doublePawn, a.enPassant) == (b.spaces, b.castle, b.doublePawn, b.enPassant)
+
+def scoreMove(game: Game, mv: Move, depth: int = 0) -> MoveScore:
+    """Analyse mv from the position of game, searching depth plies past it. mv is legal only if it is one of the moves the piece on its start space can make on its turn. game is only read, never changed"""
+    piece = game.getSpace(mv.startPos())
+    if piece is None or piece.color != game.turn or not any(_sameMove(mv, m) for m in piece.getMoves(checkEnabled=True)):
+        return MoveScore(mv, False)
+    newBoard = child(game, mv)
+    status = newBoard.gameOver()
+    if status == "checkmate":
+        return MoveScore(mv, True, status, MATE - 1)
+    if status == "stalemate":
+        return MoveScore(mv, True, status, 0)
+    if depth == 0:
+        return MoveScore(mv, True, status, -evaluate(newBoard))
+    searcher = Searcher(newBoard)
+    return MoveScore(mv, True, status, -searcher.negamax(newBoard, depth, -MATE - 1, MATE + 1, 1))
+
+def scoreMoves(game: Game, moves: list[Move], depth: int = 0, maxWorkers: Optional[int] = None) -> list[MoveScore]:
+    """Analyse each of moves from the position of game concurrently on a thread pool, returning results in the same order as moves"""
+    with ThreadPoolExecutor(maxWorkers) as pool:
+        return list(pool.map(lambda mv: scoreMove(game, mv, depth), moves))
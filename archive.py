@@ -0,0 +1,171 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Iterator, Optional
+from game import Game
+from compact import encodeMove, decodeMove
+
+# File layout, all integers little-endian:
+#   header  MAGIC, format version (uint16), reserved (uint16)
+#   games   for each game: result (uint8), move count (uint16), then each move as a 16 bit code from compact.encodeMove
+#   index   file offset of each game (uint64)
+#   footer  offset of the index (uint64), number of games (uint64), INDEX_MAGIC
+# Appending writes the new games after the existing footer, followed by a new index of every game and a new footer, so stored
+# bytes are never changed and a reader only needs the last footer to find any game. The new footer is written only once the
+# games and index before it are on disk. If a writer is interrupted, readers use the last complete footer, and the next
+# appending writer removes whatever was left after it. New archives are written to a temporary file that replaces path on close.
+MAGIC = b"CHESSARC"
+INDEX_MAGIC = b"CHESSIDX"
+VERSION = 1
+HEADER = struct.Struct("<8sHH")
+RECORD = struct.Struct("<BH")
+OFFSET = struct.Struct("<Q")
+FOOTER = struct.Struct("<QQ8s")
+RESULTS = ("", "checkmate", "stalemate") # stored as the index of Game.status
+
+def _codes(data: bytes) -> array:
+    """Return little-endian 16 bit move codes as an array"""
+    codes = array("H", data)
+    if sys.byteorder == "big":
+        codes.byteswap()
+    return codes
+
+class ArchiveWriter:
+    """Appends finished games to an archive file. Games must start from the standard starting position, since only their moves are stored"""
+    def __init__(self, path: str, append: bool = False) -> None:
+        """Create a new archive at path, or add to the end of an existing one if append is True"""
+        self._path = path
+        self._tempPath: Optional[str] = None
+        self._offsets: list[int] = []
+        self._start = Game()._encodeCheckpoint()
+        if append and os.path.exists(path):
+            with ArchiveReader(path) as reader:
+                self._offsets = [reader._offset(i) for i in range(len(reader))]
+                end = reader._end
+            self._file: BinaryIO = open(path, "r+b")
+            self._file.seek(end)
+            self._file.truncate() # remove anything an interrupted writer left after the last complete footer
+        else:
+            self._tempPath = path + ".tmp"
+            self._file = open(self._tempPath, "wb")
+            self._file.write(HEADER.pack(MAGIC, VERSION, 0))
+
+    def add(self, game: Game) -> int:
+        """Write the moves and result of game and return its index in the archive"""
+        if len(game.moveHistory) > 0xFFFF:
+            raise ValueError("Game has too many moves to archive")
+        if not self._startsFromStandard(game):
+            raise ValueError("Game did not start from the standard starting position")
+        codes = array("H", (encodeMove(mv) for mv in game.moveHistory))
+        if sys.byteorder == "big":
+            codes.byteswap()
+        self._offsets.append(self._file.tell())
+        self._file.write(RECORD.pack(RESULTS.index(game.status), len(codes)))
+        self._file.write(codes.tobytes())
+        return len(self._offsets) - 1
+
+    def _startsFromStandard(self, game: Game) -> bool:
+        """Return True if replaying the moveHistory of game from the standard starting position reaches its current position"""
+        start = game._checkpoints.get(0)
+        if start is not None: # saved before the first move, unless moveHistory began with a move that only enables en passant
+            return start == self._start
+        replayed = Game(checkEnabled=False, checkpointInterval=0)
+        try:
+            for mv in game.moveHistory:
+                replayed.move(mv, evaluate=False)
+        except RuntimeError: # a move from an empty space
+            return False
+        return replayed._encodeCheckpoint() == game._encodeCheckpoint() # includes the turn
+
+    def close(self) -> None:
+        """Write the index and footer and close the file, replacing path with it if it is a new archive"""
+        indexOffset = self._file.tell()
+        for offset in self._offsets:
+            self._file.write(OFFSET.pack(offset))
+        self._file.flush()
+        os.fsync(self._file.fileno()) # games and index reach the disk before the footer that points to them
+        self._file.write(FOOTER.pack(indexOffset, len(self._offsets), INDEX_MAGIC))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        if self._tempPath is not None:
+            os.replace(self._tempPath, self._path)
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+class ArchiveReader:
+    """Reads games from an archive file through mmap, so loading one game does not parse any other"""
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size + FOOTER.size:
+            raise ValueError(f"{path} is not a game archive")
+        magic, version, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a game archive")
+        if version != VERSION:
+            raise ValueError(f"{path} has unsupported archive version {version}")
+        self._end = self._findFooter()
+        if self._end == 0:
+            raise ValueError(f"{path} is not a game archive")
+        self._indexOffset, self._count, _ = FOOTER.unpack_from(self._map, self._end - FOOTER.size)
+
+    def _findFooter(self) -> int:
+        """Return the end of the last complete footer, or 0 if there is none. Anything after it was left by an interrupted writer"""
+        end = len(self._map)
+        while end >= HEADER.size + FOOTER.size:
+            indexOffset, count, indexMagic = FOOTER.unpack_from(self._map, end - FOOTER.size)
+            if indexMagic == INDEX_MAGIC and HEADER.size <= indexOffset and indexOffset + count * OFFSET.size == end - FOOTER.size:
+                return end
+            end = self._map.rfind(INDEX_MAGIC, HEADER.size, end - 1) + len(INDEX_MAGIC) # next earlier footer, or too small to loop if none
+        return 0
+
+    def __len__(self) -> int:
+        """Return the number of games in the archive"""
+        return self._count
+
+    def _offset(self, i: int) -> int:
+        """Return the file offset of game i"""
+        if not 0 <= i < self._count:
+            raise IndexError(f"Archive has no game {i}")
+        return OFFSET.unpack_from(self._map, self._indexOffset + i * OFFSET.size)[0]
+
+    def moveCodes(self, i: int) -> array:
+        """Return the encoded moves of game i"""
+        offset = self._offset(i)
+        _, count = RECORD.unpack_from(self._map, offset)
+        start = offset + RECORD.size
+        return _codes(self._map[start:start + count * 2])
+
+    def result(self, i: int) -> str:
+        """Return the stored status of game i: checkmate, stalemate, or an empty string"""
+        return RESULTS[RECORD.unpack_from(self._map, self._offset(i))[0]]
+
+    def load(self, i: int, checkEnabled: bool = True) -> Game:
+        """Return game i reconstructed by executing its moves with Game.move. The stored result is used instead of checking whether the game is over after every move"""
+        game = Game(checkEnabled=checkEnabled)
+        for code in self.moveCodes(i):
+            game.move(decodeMove(code), evaluate=False)
+        game.status = self.result(i)
+        return game
+
+    def games(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Game]:
+        """Iterate over reconstructed games from index start up to but not including stop"""
+        for i in range(start, self._count if stop is None else min(stop, self._count)):
+            yield self.load(i)
+
+    def close(self) -> None:
+        """Close the memory map"""
+        self._map.close()
+
+    def __enter__(self) -> "ArchiveReader":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
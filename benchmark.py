@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+from game import Game
+from pieces import Move
+from compact import CompactGame
+from search import child
+
+def randomGame(plies: int, rng: random.Random) -> list[Move]:
+    """Return the moves of a game of up to plies random legal moves"""
+    game = Game()
+    for _ in range(plies):
+        moves = list(game._moves(game.turn))
+        if len(moves) == 0:
+            break
+        game.move(rng.choice(moves), evaluate=False)
+    return game.moveHistory
+
+def _copyMove(mv: Move) -> Move:
+    """Return a new Move equal to mv so measured games do not share Move objects"""
+    return Move(list(mv.spaces), mv.castle, mv.doublePawn, mv.enPassant)
+
+def _replay(moves: list[Move], checkpointInterval: int = 16) -> Game:
+    """Return a Game with moves executed"""
+    game = Game(checkpointInterval=checkpointInterval)
+    for mv in moves:
+        game.move(_copyMove(mv), evaluate=False)
+    return game
+
+def _bytesPerGame(build: Callable[[Any], object], sources: list[Any]) -> float:
+    """Return the average memory allocated per game kept alive when calling build on each source"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build(source) for source in sources]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(kept)
+
+def memory(games: int, plies: int, seed: int) -> None:
+    """Print bytes per game stored as a Game compared to a CompactGame"""
+    rng = random.Random(seed)
+    histories = [randomGame(plies, rng) for _ in range(games)]
+    full = _bytesPerGame(_replay, histories)
+    compact = _bytesPerGame(CompactGame.fromGame, [_replay(moves) for moves in histories]) # build Games first so only the records are measured
+    print(f"{games} games of up to {plies} plies")
+    print(f"Game:        {full:10.0f} bytes per game")
+    print(f"CompactGame: {compact:10.0f} bytes per game ({full / compact:.1f}x smaller)")
+
+def seek(plies: int, seeks: int, intervals: list[int], seed: int) -> None:
+    """Print average time to reach random plies of one game by replaying every move through Game.move compared to Game.seek with each checkpoint interval"""
+    rng = random.Random(seed)
+    moves = randomGame(plies, rng)
+    targets = [rng.randint(0, len(moves)) for _ in range(seeks)]
+    start = time.perf_counter()
+    for ply in targets:
+        game = Game()
+        for mv in moves[:ply]:
+            game.move(mv)
+    print(f"{len(moves)} ply game, {seeks} seeks")
+    print(f"replay:      {(time.perf_counter() - start) / seeks * 1000:8.2f} ms per seek")
+    for interval in intervals:
+        game = _replay(moves, interval)
+        start = time.perf_counter()
+        for ply in targets:
+            game.seek(ply)
+        elapsed = (time.perf_counter() - start) / seeks * 1000
+        print(f"seek K={interval:<4}: {elapsed:8.2f} ms per seek, {len(game._checkpoints) * 65} bytes of checkpoints")
+
+def perft(game: Game, depth: int) -> int:
+    """Return the number of positions reached by every sequence of depth legal moves from game"""
+    moves = list(game._moves(game.turn))
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    return sum(perft(child(game, mv), depth - 1) for mv in moves)
+
+def speed(depth: int, games: int, plies: int, seed: int) -> dict[str, float]:
+    """Return seconds taken by perft from the starting position and by gameOver on every position of random games"""
+    start = time.perf_counter()
+    nodes = perft(Game(), depth)
+    perftTime = time.perf_counter() - start
+    rng = random.Random(seed)
+    positions: list[Game] = []
+    for _ in range(games):
+        game = Game()
+        for mv in randomGame(plies, rng):
+            game.move(_copyMove(mv), evaluate=False)
+            positions.append(game._copy())
+    start = time.perf_counter()
+    for position in positions:
+        position.checkEnabled = True
+        position.gameOver()
+    return {"nodes": nodes, "perft": perftTime, "positions": len(positions), "gameOver": time.perf_counter() - start}
+
+def compiled(depth: int, games: int, plies: int, seed: int) -> None:
+    """Print the speed of the pure Python modules compared to the compiled build from build.py"""
+    results: dict[str, dict[str, float]] = {}
+    for mode in ("pure", "compiled"):
+        command = [sys.executable, "build.py", mode, "benchmark.py", "speed", "--json", "--depth", str(depth), "--games", str(games), "--plies", str(plies), "--seed", str(seed)]
+        output = subprocess.run(command, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout
+        results[mode] = json.loads(output)
+    pure, fast = results["pure"], results["compiled"]
+    print(f"perft({depth}) = {pure['nodes']:.0f}, gameOver on {pure['positions']:.0f} positions")
+    for name in ("perft", "gameOver"):
+        print(f"{name + ':':10}{pure[name]:8.3f}s pure, {fast[name]:8.3f}s compiled ({pure[name] / fast[name]:.1f}x faster)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the chess engine")
+    commands = parser.add_subparsers(dest="command", required=True)
+    memoryParser = commands.add_parser("memory", help="compare bytes per game of Game and CompactGame")
+    memoryParser.add_argument("--games", type=int, default=20)
+    memoryParser.add_argument("--plies", type=int, default=40)
+    memoryParser.add_argument("--seed", type=int, default=0)
+    seekParser = commands.add_parser("seek", help="compare replaying a game from the start with Game.seek")
+    seekParser.add_argument("--plies", type=int, default=100)
+    seekParser.add_argument("--seeks", type=int, default=5)
+    seekParser.add_argument("--intervals", type=int, nargs="+", default=[4, 16, 64])
+    seekParser.add_argument("--seed", type=int, default=0)
+    for name, help in (("speed", "time perft and gameOver with the modules that are imported"), ("compiled", "compare the speed of the pure Python modules and the compiled build")):
+        speedParser = commands.add_parser(name, help=help)
+        speedParser.add_argument("--depth", type=int, default=3)
+        speedParser.add_argument("--games", type=int, default=10)
+        speedParser.add_argument("--plies", type=int, default=60)
+        speedParser.add_argument("--seed", type=int, default=0)
+        if name == "speed":
+            speedParser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+    if args.command == "memory":
+        memory(args.games, args.plies, args.seed)
+    elif args.command == "seek":
+        seek(args.plies, args.seeks, args.intervals, args.seed)
+    elif args.command == "speed":
+        results = speed(args.depth, args.games, args.plies, args.seed)
+        if args.json:
+            print(json.dumps(results))
+        else:
+            print(f"perft({args.depth}) = {results['nodes']:.0f} in {results['perft']:.3f}s, gameOver on {results['positions']:.0f} positions in {results['gameOver']:.3f}s")
+    elif args.command == "compiled":
+        compiled(args.depth, args.games, args.plies, args.seed)
@@ -0,0 +1,103 @@
+import argparse
+import glob
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import os
+import runpy
+import shutil
+import subprocess
+import sys
+from types import ModuleType
+from typing import Optional, Sequence
+
+# Modules compiled with mypyc. Python imports a compiled extension module in preference to the .py file of the same name,
+# so once built they are used automatically, and the .py files are used whenever no build exists for the running Python
+COMPILED_MODULES = ("pieces", "compact", "game")
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+class PureFinder(importlib.abc.MetaPathFinder):
+    """Import finder that loads COMPILED_MODULES from their .py files even when a compiled build exists"""
+    def find_spec(self, name: str, path: Optional[Sequence[str]], target: Optional[ModuleType] = None) -> Optional[importlib.machinery.ModuleSpec]:
+        if name not in COMPILED_MODULES:
+            return None
+        return importlib.util.spec_from_file_location(name, os.path.join(ROOT, f"{name}.py"))
+
+def usePure() -> None:
+    """Make later imports of COMPILED_MODULES load the pure Python source"""
+    for name in COMPILED_MODULES:
+        if name in sys.modules:
+            raise RuntimeError(f"{name} was already imported")
+    sys.meta_path.insert(0, PureFinder())
+
+def isCompiled(module: ModuleType) -> bool:
+    """Return True if module was loaded from a compiled extension"""
+    return module.__file__ is not None and module.__file__.endswith(tuple(importlib.machinery.EXTENSION_SUFFIXES))
+
+def builtFiles() -> list[str]:
+    """Return paths of compiled extensions in ROOT, including the shared library mypyc builds for them"""
+    files: list[str] = []
+    for suffix in importlib.machinery.EXTENSION_SUFFIXES:
+        for name in COMPILED_MODULES:
+            files += glob.glob(os.path.join(ROOT, f"{name}{suffix}"))
+        files += glob.glob(os.path.join(ROOT, f"*__mypyc{suffix}"))
+    return files
+
+def isStale() -> bool:
+    """Return True if any source of COMPILED_MODULES changed after the build for the running Python"""
+    built = [os.path.getmtime(path) for path in builtFiles()]
+    sources = [os.path.getmtime(os.path.join(ROOT, f"{name}.py")) for name in COMPILED_MODULES]
+    return len(built) > 0 and max(sources) > min(built)
+
+def build() -> None:
+    """Compile COMPILED_MODULES with mypyc for the running Python, placing the extensions next to the sources"""
+    clean()
+    subprocess.run([sys.executable, "-m", "mypyc", *(f"{name}.py" for name in COMPILED_MODULES)], cwd=ROOT, check=True)
+    shutil.rmtree(os.path.join(ROOT, "build"), ignore_errors=True) # generated C sources and object files
+
+def clean() -> None:
+    """Remove compiled extensions so the pure Python modules are imported"""
+    for path in builtFiles():
+        os.remove(path)
+
+def runTests(pure: bool) -> int:
+    """Run tests.py in a new process against the pure Python or compiled modules and return its exit code"""
+    command = [sys.executable, os.path.abspath(__file__), "pure" if pure else "compiled", "tests.py"]
+    print(f"Testing {'pure Python' if pure else 'compiled'} modules", flush=True)
+    return subprocess.run(command, cwd=ROOT).returncode
+
+def run(pure: bool, script: str, args: list[str]) -> None:
+    """Run script with args using the pure Python or compiled modules"""
+    if pure:
+        usePure()
+    else:
+        import game
+        if not isCompiled(game):
+            raise RuntimeError("No compiled build for this Python, run python build.py first")
+        if isStale():
+            raise RuntimeError("Compiled build is older than its sources, run python build.py again")
+    sys.argv = [script, *args]
+    runpy.run_path(script, run_name="__main__")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optional compiled build of the move generator and game modules with mypyc")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("clean", help="remove the compiled build")
+    testParser = commands.add_parser("test", help="run tests.py against the pure Python modules and the compiled build")
+    testParser.add_argument("--pure-only", action="store_true", help="skip the compiled build")
+    for mode in ("pure", "compiled"):
+        modeParser = commands.add_parser(mode, help=f"run a script with the {mode} modules")
+        modeParser.add_argument("script")
+        modeParser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+    if args.command is None:
+        build()
+    elif args.command == "clean":
+        clean()
+    elif args.command == "test":
+        codes = [runTests(pure=True)]
+        if not args.pure_only:
+            codes.append(runTests(pure=False))
+        sys.exit(max(codes))
+    else:
+        run(args.command == "pure", args.script, args.args)
@@ -0,0 +1,144 @@
+from array import array
+from pieces import Move, Piece, King, Queen, Bishop, Knight, Rook, Pawn, Coordinate
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from game import Game
+
+# A piece is stored in one byte: bits 0-2 index into PIECE_TYPES, bit 3 is set for black, bit 4 is set if the piece has moved.
+# Castling availability is carried by the moved bit of each King and Rook, the same way Game tracks it with hasMoved.
+PIECE_TYPES: tuple[type[Piece], ...] = (Pawn, Knight, Bishop, Rook, Queen, King) # code 0 is reserved for an empty space
+BLACK = 8
+MOVED = 16
+TYPE_MASK = 7
+
+# A move is stored in 16 bits: start index in bits 0-5, end index in bits 6-11, and one of these flags in bits 12-15
+NORMAL, DOUBLE_PAWN, EN_PASSANT, KINGSIDE, QUEENSIDE = range(5)
+
+def encodePiece(piece: Optional[Piece]) -> int:
+    """Return the byte representing piece, or 0 for an empty space"""
+    if piece is None:
+        return 0
+    code = PIECE_TYPES.index(type(piece)) + 1
+    if piece.color == "black":
+        code |= BLACK
+    if piece.hasMoved:
+        code |= MOVED
+    return code
+
+def decodePiece(code: int) -> Optional[Piece]:
+    """Return a new Piece represented by code, or None if code is 0"""
+    if code == 0:
+        return None
+    piece = PIECE_TYPES[(code & TYPE_MASK) - 1]("black" if code & BLACK else "white")
+    piece.hasMoved = bool(code & MOVED)
+    return piece
+
+def encodeMove(mv: Move) -> int:
+    """Return the 16 bit integer representing mv"""
+    (r1, c1), (r2, c2) = mv.startPos(), mv.endPos()
+    if mv.castle:
+        flag = KINGSIDE if mv.castle == "kingside" else QUEENSIDE
+    elif mv.doublePawn:
+        flag = DOUBLE_PAWN
+    elif mv.enPassant:
+        flag = EN_PASSANT
+    else:
+        flag = NORMAL
+    return (r1 * 8 + c1) | (r2 * 8 + c2) << 6 | flag << 12
+
+def decodeMove(code: int) -> Move:
+    """Return a new Move represented by code, rebuilding every space it passes through"""
+    start, end, flag = code & 63, code >> 6 & 63, code >> 12
+    r1, c1, r2, c2 = start // 8, start % 8, end // 8, end % 8
+    if flag == KINGSIDE:
+        return Move([(r1,4),(r1,5),(r1,6)], castle="kingside")
+    if flag == QUEENSIDE:
+        return Move([(r1,4),(r1,3),(r1,1),(r1,2)], castle="queenside")
+    if flag == EN_PASSANT:
+        return Move([(r1,c1),(r2,c2)], enPassant=True)
+    dr, dc = r2 - r1, c2 - c1
+    spaces: list[Coordinate] = [(r1,c1)]
+    if dr == 0 or dc == 0 or abs(dr) == abs(dc): # straight line, so include every space in between
+        length = max(abs(dr), abs(dc))
+        for i in range(1, length + 1):
+            spaces.append((r1 + dr // length * i, c1 + dc // length * i))
+    else: # knight only records its first and last space
+        spaces.append((r2,c2))
+    if flag == DOUBLE_PAWN:
+        return Move(spaces, doublePawn="white" if r1 == 6 else "black")
+    return Move(spaces)
+
+class CompactGame:
+    """Memory efficient record of a Game: the board is a 64 byte bytearray, the turn and en passant column fit in a two byte bytearray, and the move history is an array of 16 bit encoded moves. Use toGame to get a playable Game"""
+    __slots__ = ("board", "state", "history")
+
+    def __init__(self) -> None:
+        """Initialize an empty board with white to move"""
+        self.board = bytearray(64)
+        self.state = bytearray(2) # turn (0 for white, 1 for black), column + 1 of a pawn that can be taken by en passant or 0
+        self.history = array("H")
+
+    @classmethod
+    def fromGame(cls, game: "Game") -> "CompactGame":
+        """Return a CompactGame in the same state as game"""
+        compact = cls()
+        for r in range(8):
+            for c in range(8):
+                compact.board[r * 8 + c] = encodePiece(game.getSpace((r,c)))
+        compact.history.extend(encodeMove(mv) for mv in game.moveHistory)
+        compact.state[0] = 0 if game.turn == "white" else 1
+        if len(game.moveHistory) > 0 and game.moveHistory[-1].doublePawn:
+            compact.state[1] = game.moveHistory[-1].endPos()[1] + 1
+        return compact
+
+    def getSpace(self, pos: Coordinate) -> int:
+        """Return the byte representing the contents of the space at pos"""
+        return self.board[pos[0] * 8 + pos[1]]
+
+    def turn(self) -> str:
+        """Return the color of the current turn"""
+        return "black" if self.state[0] else "white"
+
+    def move(self, mv: Move) -> None:
+        """Execute Move mv, handling special cases the same way as Game.move. Legality is not checked"""
+        start = mv.startPos()[0] * 8 + mv.startPos()[1]
+        end = mv.endPos()[0] * 8 + mv.endPos()[1]
+        code = self.board[start]
+        if code == 0:
+            raise RuntimeError("Tried to move from empty space")
+        self.board[end] = code | MOVED
+        self.board[start] = 0
+
+        if mv.castle != "": # move rook if castle
+            row = 0 if code & BLACK else 7
+            oldCol,newCol = (7,5) if mv.castle == "kingside" else (0,3)
+            self.board[row * 8 + newCol] = self.board[row * 8 + oldCol] | MOVED
+            self.board[row * 8 + oldCol] = 0
+
+        if mv.enPassant: # remove pawn if en passant, which is beside the start of the capturing pawn
+            self.board[mv.startPos()[0] * 8 + self.state[1] - 1] = 0
+
+        oppRow = 7 if code & BLACK else 0
+        if PIECE_TYPES[(code & TYPE_MASK) - 1] is Pawn and mv.endPos()[0] == oppRow: # pawn promotion
+            self.board[end] = PIECE_TYPES.index(Queen) + 1 | (code & BLACK)
+
+        self.history.append(encodeMove(mv))
+        self.state[0] ^= 1
+        self.state[1] = mv.endPos()[1] + 1 if mv.doublePawn else 0
+
+    def moveHistory(self) -> list[Move]:
+        """Return a list of new Move objects for every move made, oldest first"""
+        return [decodeMove(code) for code in self.history]
+
+    def toGame(self, checkEnabled: bool = True) -> "Game":
+        """Return a new playable Game in the state of this record"""
+        from game import Game # imported here since game imports this module for checkpoints
+        game = Game(populate=False, checkEnabled=checkEnabled)
+        for i in range(64):
+            piece = decodePiece(self.board[i])
+            if piece is not None:
+                game.setSpace(piece, (i // 8, i % 8))
+        game.turn = self.turn()
+        game.moveHistory = self.moveHistory()
+        return game
@@ -1,14 +1,22 @@
 from pieces import Move, Piece, King, Queen, Bishop, Knight, Rook, Pawn, Coordinate
+from compact import encodePiece, decodePiece
 from typing import Optional, Generator
 
 class Game:
-    def __init__(self, populate: bool = True, checkEnabled: bool = True) -> None:
+    def __init__(self, populate: bool = True, checkEnabled: bool = True, checkpointInterval: int = 16) -> None:
         """Initialize board and populate with starting pieces"""
         self._board: list[list[Optional[Piece]]] = [[None]*8 for i in range(8)]
         self.checkEnabled = checkEnabled # False for testing of boardstates without a king or detecting if moves result in check
         self.moveHistory: list[Move] = []
+        self.checkpointInterval = checkpointInterval # plies between positions saved for seek, trading memory for seek speed. 0 disables checkpoints
+        self._checkpoints: dict[int, bytes] = {} # encoded board and turn, keyed by the length of moveHistory when saved
         self.visibleMoves: list[Move] = []
         self.turn = "white"
+        self.status = "" # result of gameOver after the most recent move, updated only when move evaluates it
+        self._pieceSets: dict[str, dict[Piece, None]] = {"white": {}, "black": {}} # pieces on the board by color, in the order they were placed
+        self._kings: dict[str, King] = {} # king of each color on the board
+        self._attacks: dict[str, list[int]] = {"white": [0]*64, "black": [0]*64} # number of pieces of each color attacking each space, indexed by row*8+col
+        self._attacked: dict[Piece, list[int]] = {} # spaces attacked by each piece, replaced rather than changed in place so copies can share them
         if populate: # False for testing with an initially empty board
             pieceList = [Rook,Knight,Bishop,Queen,King,Bishop,Knight,Rook]
             for col in range(8):
@@ -22,17 +30,71 @@ class Game:
         return self._board[pos[0]][pos[1]]
 
     def setSpace(self, content: Optional[Piece], pos: Coordinate) -> None:
-        """Set contents of space at pos"""
+        """Set contents of space at pos, updating the piece and king indexes and the attack maps"""
+        old = self._board[pos[0]][pos[1]]
+        if old is not None and old is not content and old.pos == pos: # old piece was captured or cleared, rather than having already moved to another space
+            self._removePiece(old)
         self._board[pos[0]][pos[1]] = content
         if isinstance(content, Piece):
             content.setBoard(self)
             content.pos = pos
+            self._pieceSets[content.color][content] = None
+            if isinstance(content, King):
+                self._kings[content.color] = content
+            self._updateAttacks(content)
+        self._updateLinesThrough(pos, content)
 
-    def move(self, mv: Move) -> None:
-        """Execute Move mv"""
+    def _removePiece(self, piece: Piece) -> None:
+        """Remove piece from the piece and king indexes and the attack maps"""
+        self._pieceSets[piece.color].pop(piece, None)
+        if self._kings.get(piece.color) is piece:
+            del self._kings[piece.color]
+            for p in self._pieceSets[piece.color]: # boards set up for testing may have another king
+                if isinstance(p, King):
+                    self._kings[p.color] = p
+        counts = self._attacks[piece.color]
+        for i in self._attacked.pop(piece, []):
+            counts[i] -= 1
+
+    def _updateAttacks(self, piece: Piece) -> None:
+        """Replace the spaces attacked by piece in the attack map of its color with the spaces it attacks now"""
+        counts = self._attacks[piece.color]
+        for i in self._attacked.get(piece, []):
+            counts[i] -= 1
+        attacked = [r*8 + c for r, c in piece.getAttacks()]
+        for i in attacked:
+            counts[i] += 1
+        self._attacked[piece] = attacked
+
+    def _updateLinesThrough(self, pos: Coordinate, skip: Optional[Piece]) -> None:
+        """Update the attacks of Bishops, Rooks, and Queens whose lines reach pos, since changing pos lengthens or shortens them. Only these pieces need updating, as the attacks of other pieces do not depend on the board"""
+        for dr, dc in Piece.ALL_DIRECTIONS:
+            p = self._firstPiece(pos, (dr,dc))
+            if p is not None and p is not skip and (-dr,-dc) in p.SLIDING_DIRECTIONS:
+                self._updateAttacks(p)
+
+    def _firstPiece(self, pos: Coordinate, direction: Coordinate) -> Optional[Piece]:
+        """Return the first piece found moving from pos in direction, or None if the edge of the board is reached. The space a piece is moving away from during move is treated as empty"""
+        row, col = pos[0] + direction[0], pos[1] + direction[1]
+        while 0 <= row <= 7 and 0 <= col <= 7:
+            p = self._board[row][col]
+            if p is not None and p.pos == (row,col):
+                return p
+            row += direction[0]
+            col += direction[1]
+        return None
+
+    def attackCount(self, pos: Coordinate, color: str) -> int:
+        """Return the number of pieces of color attacking the space at pos"""
+        return self._attacks[color][pos[0]*8 + pos[1]]
+
+    def move(self, mv: Move, evaluate: bool = True) -> None:
+        """Execute Move mv. If evaluate is False, skip checking whether the game is over"""
         piece = self.getSpace(mv.startPos())
         if piece is None:
             raise RuntimeError("Tried to move from empty space")
+        if self.checkpointInterval > 0 and len(self._checkpoints) == 0: # save the position before the first move for seek to start from
+            self._saveCheckpoint()
         piece.hasMoved = True
         self.setSpace(piece, mv.endPos())
         self.setSpace(None, mv.startPos())
@@ -55,12 +117,43 @@ class Game:
 
         self.moveHistory.append(mv)
         self.turn = self._oppositeColor()
+        if self.checkpointInterval > 0 and len(self.moveHistory) % self.checkpointInterval == 0:
+            self._saveCheckpoint()
 
-        if self.checkEnabled:
-            endState = self.gameOver()
-            if endState: 
-                print(endState)
+        if self.checkEnabled and evaluate:
+            self.status = self.gameOver()
+            if self.status: 
+                print(self.status)
     
+    def _encodeCheckpoint(self) -> bytes:
+        """Return the current board and turn encoded for seek to restore"""
+        board = bytes(encodePiece(p) for row in self._board for p in row)
+        return board + (b"w" if self.turn == "white" else b"b")
+
+    def _saveCheckpoint(self) -> None:
+        """Save the current board and turn for seek to restore"""
+        self._checkpoints[len(self.moveHistory)] = self._encodeCheckpoint()
+
+    def seek(self, ply: int) -> "Game":
+        """Return a new Game in the position after the first ply moves of moveHistory. The nearest checkpoint, or the current position if ply is the last ply, is restored and at most checkpointInterval moves are replayed without checking whether the game is over"""
+        saved = [p for p in self._checkpoints if p <= ply]
+        if ply == len(self.moveHistory):
+            start, checkpoint = ply, self._encodeCheckpoint() # read only, so seek stays safe to call from multiple threads
+        elif ply > len(self.moveHistory) or len(saved) == 0:
+            raise ValueError(f"No position saved for ply {ply}")
+        else:
+            start = max(saved)
+            checkpoint = self._checkpoints[start]
+        newBoard = Game(populate=False, checkEnabled=self.checkEnabled, checkpointInterval=self.checkpointInterval)
+        for i in range(64):
+            newBoard.setSpace(decodePiece(checkpoint[i]), (i // 8, i % 8))
+        newBoard.turn = "white" if checkpoint[64:] == b"w" else "black"
+        newBoard.moveHistory = self.moveHistory[:start]
+        newBoard._checkpoints = {p: c for p, c in self._checkpoints.items() if p <= start}
+        for mv in self.moveHistory[start:ply]:
+            newBoard.move(mv, evaluate=False)
+        return newBoard
+
     def click(self, pos: Coordinate) -> None:
         """If a piece is already selected, execute the move that ends in the clicked space or deselect if another space is clicked. If a piece is not selected, highlight the moves of the clicked piece if the color matches the turn."""
         if len(self.visibleMoves) > 0:
@@ -79,48 +172,87 @@ class Game:
 
     def _copy(self) -> "Game":
         """Return a copy of self"""
-        newBoard = Game(populate=False, checkEnabled=False)
-        for p in self._pieces():
+        newBoard = Game(populate=False, checkEnabled=False, checkpointInterval=0) # copies are short lived, so skip checkpoints
+        for p in self._pieces(): # fill in indexes directly, since attacks do not need to be found again
             assert p.pos is not None
-            newBoard.setSpace(p.copy(newBoard), p.pos)
+            new = p.copy(newBoard)
+            new.setBoard(newBoard)
+            newBoard._board[p.pos[0]][p.pos[1]] = new
+            newBoard._pieceSets[new.color][new] = None
+            newBoard._attacked[new] = self._attacked[p]
+            if isinstance(new, King) and self._kings.get(p.color) is p:
+                newBoard._kings[p.color] = new
+        newBoard._attacks = {color: counts.copy() for color, counts in self._attacks.items()}
         newBoard.turn = self.turn
         newBoard.moveHistory = self.moveHistory.copy()
         return newBoard
     
     def _pieces(self, color: Optional[str] = None) -> Generator[Piece]:
         """Iterate over all pieces with matching color if specified"""
-        for r in range(8):
-            for c in range(8):
-                content = self._board[r][c]
-                if isinstance(content, Piece) and (color is None or content.color == color):
-                    yield content
+        for c in ("white", "black") if color is None else (color,):
+            yield from list(self._pieceSets[c]) # copy so the board can change while iterating
+
+    def checkConsistency(self) -> None:
+        """Raise RuntimeError if the piece or king indexes disagree with the board"""
+        for color in ("white", "black"):
+            onBoard = [p for row in self._board for p in row if p is not None and p.color == color]
+            if set(onBoard) != set(self._pieceSets[color]):
+                raise RuntimeError(f"{color} piece index {list(self._pieceSets[color])} does not match board {onBoard}")
+            for p in onBoard:
+                if p.pos is None or self.getSpace(p.pos) is not p:
+                    raise RuntimeError(f"{p!r} is not at its position")
+            kings = [p for p in onBoard if isinstance(p, King)]
+            king = self._kings.get(color)
+            if (king is None and len(kings) > 0) or (king is not None and king not in kings):
+                raise RuntimeError(f"{color} king index {self._kings.get(color)!r} does not match board {kings}")
+            counts = [0]*64
+            for p in onBoard:
+                for r, c in p.getAttacks():
+                    counts[r*8 + c] += 1
+            if counts != self._attacks[color]:
+                raise RuntimeError(f"{color} attack map {self._attacks[color]} does not match board {counts}")
     
-    def _moves(self, color: Optional[str] = None) -> Generator[Move]:
-        """Iterate over moves of all pieces with matching color if specified"""
+    def _moves(self, color: Optional[str] = None, checkEnabled: Optional[bool] = None) -> Generator[Move]:
+        """Iterate over moves of all pieces with matching color if specified. checkEnabled overrides self.checkEnabled if given"""
         for p in self._pieces(color):
-            for m in p.getMoves():
+            for m in p.getMoves(checkEnabled):
                 yield m
 
     def causesCheck(self, mv: Move) -> bool:
-        """Return True if a move results in a player putting themself in check"""
-        newBoard = self._copy()
-        newBoard.move(mv)
-        newBoard.turn = self.turn
-        return newBoard.inCheck()
-
-    def inCheck(self) -> bool:
-        """Return True if the color of the current turn is in check"""
-        for p in self._pieces(self.turn): # find king of current player
-            if isinstance(p, King):
-                king = p
-                break
-        self.checkEnabled = False # prevent potential moves from themselves looking for check
-        for m in self._moves(self._oppositeColor()):
-            if m.endPos() == king.pos:
-                self.checkEnabled = True
-                return True # There is a piece of the opposite color that could capture the king
-        self.checkEnabled = True
-        return False
+        """Return True if a move results in a player putting themself in check. Most moves are answered from the attack maps, and the rest by making the move on a copy of the board, so this is safe to call from multiple threads"""
+        piece = self.getSpace(mv.startPos())
+        if piece is None:
+            raise RuntimeError("Tried to move from empty space")
+        king = self._kings.get(piece.color)
+        if king is None or king.pos is None:
+            raise RuntimeError(f"No {piece.color} king on board")
+        opponent = "black" if piece.color == "white" else "white"
+        direction = _direction(king.pos, mv.endPos())
+        if piece is king: # moving into an attacked space, or along the line of a piece attacking the king
+            assert direction is not None # kings only move in straight lines
+            behind = self._firstPiece(king.pos, (-direction[0], -direction[1]))
+            return self.attackCount(mv.endPos(), opponent) > 0 or (behind is not None and behind.color == opponent and direction in behind.SLIDING_DIRECTIONS)
+        if mv.enPassant or self.attackCount(king.pos, opponent) > 0: # removing two pieces from a line, or getting out of check
+            newBoard = self._copy()
+            newBoard.move(mv)
+            return newBoard.inCheck(piece.color)
+        pin = _direction(king.pos, mv.startPos()) # piece is pinned if it is the only piece between the king and an attacker
+        if pin is None or self._firstPiece(king.pos, pin) is not piece:
+            return False
+        attacker = self._firstPiece(mv.startPos(), pin)
+        if attacker is None or attacker.color != opponent or (-pin[0], -pin[1]) not in attacker.SLIDING_DIRECTIONS:
+            return False
+        return direction != pin # a pinned piece may only move along the line between the king and attacker
+
+    def inCheck(self, color: Optional[str] = None) -> bool:
+        """Return True if color [defaults to color of the current turn] is in check. Does not change the board, so this is safe to call from multiple threads"""
+        if color is None:
+            color = self.turn
+        king = self._kings.get(color)
+        if king is None:
+            raise RuntimeError(f"No {color} king on board")
+        assert king.pos is not None
+        return self.attackCount(king.pos, "black" if color == "white" else "white") > 0
     
     def gameOver(self) -> str:
         """Return a string 'checkmate' or 'stalemate' if the game is over, otherwise return an empty string"""
@@ -130,4 +262,11 @@ class Game:
         if self.inCheck():
             return "checkmate"
         else:
-            return "stalemate"
\ No newline at end of file
+            return "stalemate"
+
+def _direction(start: Coordinate, end: Coordinate) -> Optional[Coordinate]:
+    """Return the step from start towards end as a tuple of -1, 0, or 1 if they share a row, column, or diagonal, otherwise None"""
+    dr, dc = end[0] - start[0], end[1] - start[1]
+    if (dr, dc) == (0, 0) or not (dr == 0 or dc == 0 or abs(dr) == abs(dc)):
+        return None
+    return ((dr > 0) - (dr < 0), (dc > 0) - (dc < 0))
@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import random
+import time
+from typing import Optional
+from server import GameServer, SessionPool
+
+async def _request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, line: str) -> list[str]:
+    """Send one command and return the words of the response, raising RuntimeError on an error response"""
+    writer.write((line + "\n").encode())
+    await writer.drain()
+    response = (await reader.readline()).decode().split()
+    if len(response) == 0 or response[0] != "ok":
+        raise RuntimeError(f"{line!r} failed: {' '.join(response)}")
+    return response[1:]
+
+async def playSession(host: str, port: int, plies: int, seed: int, latencies: list[float]) -> None:
+    """Play one game of random moves on its own connection, recording the latency of each move command in seconds"""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        sessionId = (await _request(reader, writer, "new"))[0]
+        for _ in range(plies):
+            moves = await _request(reader, writer, f"moves {sessionId}")
+            if len(moves) == 0:
+                break
+            mv = rng.choice(moves)
+            start = time.perf_counter()
+            status = await _request(reader, writer, f"move {sessionId} {' '.join(mv)}")
+            latencies.append(time.perf_counter() - start)
+            if status[0] != "-":
+                break
+        await _request(reader, writer, f"close {sessionId}")
+    finally:
+        writer.close()
+
+async def runLoad(host: str, port: int, sessions: int, plies: int, seed: int = 0) -> list[float]:
+    """Play sessions games concurrently and return every move latency in seconds"""
+    latencies: list[float] = []
+    await asyncio.gather(*(playSession(host, port, plies, seed + i, latencies) for i in range(sessions)))
+    return latencies
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Return the value at fraction (0 to 1) of the way through the sorted values"""
+    if len(values) == 0:
+        raise ValueError("no values")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+async def main(host: str, port: int, sessions: int, plies: int, seed: int, local: bool) -> None:
+    """Run the load test, starting an in-process server first if local is True"""
+    server: Optional[GameServer] = None
+    if local:
+        server = GameServer(SessionPool(maxSessions=sessions))
+        listener = await server.start(host, 0)
+        port = listener.sockets[0].getsockname()[1]
+    start = time.perf_counter()
+    latencies = await runLoad(host, port, sessions, plies, seed)
+    elapsed = time.perf_counter() - start
+    if server is not None:
+        await server.stop()
+    print(f"sessions={sessions} moves={len(latencies)} moves/s={len(latencies) / elapsed:.1f}")
+    print(f"p50={percentile(latencies, 0.5) * 1000:.1f}ms p99={percentile(latencies, 0.99) * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure move latency of the game server with many concurrent sessions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--plies", type=int, default=20, help="maximum moves played in each session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--local", action="store_true", help="start a server in this process instead of connecting to one")
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port, args.sessions, args.plies, args.seed, args.local))
@@ -7,6 +7,7 @@ SCREENHEIGHT = 720
 COLORLIGHT = (255,255,255)
 COLORDARK = (0,170,255)
 DARKERMODIFIER = 60
+ATTACKTINT = (255,80,80)
 
 sideLength = int(SCREENHEIGHT/8)
 tiles: list[list[pg.Rect]] = [[pg.Rect(col*sideLength, row*sideLength, sideLength, sideLength) for col in range(8)] for row in range(8)]
@@ -16,11 +17,16 @@ screen = pg.display.set_mode((SCREENWIDTH,SCREENHEIGHT))
 g = Game()
 clock = pg.time.Clock()
 running = True
+showAttacks = False # toggled with the a key
 
 def darker(color: tuple[int, ...]) -> tuple[int, ...]:
     """Return a tuple representing a color slightly darker than the argument"""
     return tuple(map(lambda i: i - DARKERMODIFIER if i >= DARKERMODIFIER else 0, color))
 
+def tinted(color: tuple[int, ...]) -> tuple[int, ...]:
+    """Return a tuple representing the argument blended with ATTACKTINT"""
+    return tuple((c + t) // 2 for c, t in zip(color, ATTACKTINT))
+
 while running:
     for event in pg.event.get():
         if event.type == pg.QUIT: # close window
@@ -31,11 +37,15 @@ while running:
                 for col in range(8):
                     if tiles[row][col].collidepoint(pos):
                         g.click((row,col))
+        if event.type == pg.KEYDOWN and event.key == pg.K_a: # toggle spaces attacked by the opponent
+            showAttacks = not showAttacks
                         
     # render board
     for row in range(8):
         for col in range(8):
             color: tuple[int, ...] = COLORLIGHT if (row + col) % 2 == 0 else COLORDARK
+            if showAttacks and g.attackCount((row,col), "black" if g.turn == "white" else "white") > 0:
+                color = tinted(color)
             for mv in g.visibleMoves: # darken color to highlight
                 if mv.endPos() == (row,col):
                     color = darker(color)
@@ -0,0 +1,144 @@
+import argparse
+import time
+from typing import Optional
+from game import Game
+from pieces import Move
+from snapshot import Position
+from compact import CompactGame
+from notation import fromFen, moveToUci
+
+INFINITY = 10**9
+
+class PnNode:
+    """Node of a proof-number search tree. OR nodes are positions where the attacker moves and need one proven child, AND nodes are positions where the defender moves and need every child proven"""
+    __slots__ = ("position", "move", "parent", "children", "plies", "isOr", "proof", "disproof", "key")
+
+    def __init__(self, position: Position, move: Optional[Move], parent: Optional["PnNode"], plies: int) -> None:
+        self.position = position # snapshots share rows with their parent, keeping large trees small
+        self.move = move
+        self.parent = parent
+        self.children: list[PnNode] = []
+        self.plies = plies # plies left for the attacker to deliver checkmate
+        self.isOr: bool = parent is None or not parent.isOr
+        self.proof = 1
+        self.disproof = 1
+        self.key = b""
+
+class MateResult:
+    """Answer to a forced mate query: status is mate, no mate, or unknown if the node limit was reached"""
+    def __init__(self, status: str, moves: list[Move], nodes: int, seconds: float) -> None:
+        self.status = status
+        self.moves = moves # mating line with the defender's longest resistance, empty unless status is mate
+        self.nodes = nodes
+        self.seconds = seconds
+
+class MateSolver:
+    """Proof-number search for forced checkmates. The node table holds at most maxNodes nodes, and positions shown not to be mates are remembered so transpositions are not searched twice. Proven positions are kept in the tree so the mating line can be read back"""
+    def __init__(self, maxNodes: int = 200000) -> None:
+        self.maxNodes = maxNodes
+        self.nodes = 0
+        self.disproven: set[bytes] = set()
+
+    def solve(self, game: Game, moves: int) -> MateResult:
+        """Return whether the color of the current turn of game can force checkmate in at most moves of its own moves"""
+        start = time.perf_counter()
+        self.nodes = 1
+        root = PnNode(Position.fromGame(game), None, None, 2 * moves - 1)
+        while root.proof != 0 and root.disproof != 0 and self.nodes < self.maxNodes:
+            node = self._select(root)
+            self._expand(node)
+            self._update(node)
+        elapsed = time.perf_counter() - start
+        if root.proof == 0:
+            return MateResult("mate", self._line(root), self.nodes, elapsed)
+        return MateResult("no mate" if root.disproof == 0 else "unknown", [], self.nodes, elapsed)
+
+    def _select(self, node: PnNode) -> PnNode:
+        """Return the most proving unexpanded node below node"""
+        while len(node.children) > 0:
+            if node.isOr:
+                node = min(node.children, key=lambda c: c.proof)
+            else:
+                node = min(node.children, key=lambda c: c.disproof)
+        return node
+
+    def _setResult(self, node: PnNode, proven: bool) -> None:
+        """Mark node as proven or disproven"""
+        node.proof, node.disproof = (0, INFINITY) if proven else (INFINITY, 0)
+
+    def _expand(self, node: PnNode) -> None:
+        """Generate the children of node, or solve it if the game is over or the attacker has run out of plies"""
+        game = node.position.toGame()
+        compact = CompactGame.fromGame(game)
+        node.key = bytes(compact.board) + bytes(compact.state) + bytes([node.plies])
+        moves = list(game._moves(game.turn))
+        if len(moves) == 0:
+            self._setResult(node, not node.isOr and game.inCheck()) # only checkmate of the defender is a proof
+        elif (not node.isOr and node.plies == 0) or node.key in self.disproven:
+            self._setResult(node, False)
+        else:
+            node.children = [PnNode(node.position.play(mv), mv, node, node.plies - 1) for mv in moves]
+            self.nodes += len(moves)
+
+    def _update(self, node: Optional[PnNode]) -> None:
+        """Recalculate proof and disproof numbers from node up to the root"""
+        while node is not None:
+            if len(node.children) > 0:
+                proofs = [c.proof for c in node.children]
+                disproofs = [c.disproof for c in node.children]
+                if node.isOr:
+                    node.proof, node.disproof = min(proofs), min(INFINITY, sum(disproofs))
+                else:
+                    node.proof, node.disproof = min(INFINITY, sum(proofs)), min(disproofs)
+            if node.disproof == 0:
+                self.disproven.add(node.key)
+            node = node.parent
+
+    def _line(self, node: PnNode) -> list[Move]:
+        """Return the moves from proven node to checkmate, taking the shortest mate for the attacker and the longest defense"""
+        lines = [[c.move] + self._line(c) for c in node.children if c.proof == 0 and c.move is not None]
+        if len(lines) == 0:
+            return []
+        return min(lines, key=len) if node.isOr else max(lines, key=len)
+
+def formatLine(game: Game, moves: list[Move]) -> str:
+    """Return moves in UCI notation, playing them on a copy of game to find promotions"""
+    game = game._copy()
+    texts: list[str] = []
+    for mv in moves:
+        texts.append(moveToUci(game, mv))
+        game.move(mv)
+    return " ".join(texts)
+
+def solveFile(path: str, moves: int, maxNodes: int) -> list[MateResult]:
+    """Solve every FEN in a file, one per line with an optional ';' and number of moves overriding moves, and print each result and positions per second"""
+    results: list[MateResult] = []
+    start = time.perf_counter()
+    with open(path) as positions:
+        for line in positions:
+            fen, _, count = line.partition(";")
+            if fen.strip() == "" or fen.startswith("#"):
+                continue
+            game = fromFen(fen.strip())
+            result = MateSolver(maxNodes).solve(game, int(count) if count.strip() else moves)
+            print(f"{fen.strip()}: {result.status} {formatLine(game, result.moves)} ({result.nodes} nodes)")
+            results.append(result)
+    elapsed = time.perf_counter() - start
+    print(f"{len(results)} positions in {elapsed:.1f}s ({len(results) / elapsed:.2f} positions/s)")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find forced checkmates with proof-number search")
+    parser.add_argument("fen", nargs="?", help="position to solve, if not solving a file")
+    parser.add_argument("--file", help="file of FEN positions to solve, one per line")
+    parser.add_argument("--moves", type=int, default=2, help="find mates in at most this many moves")
+    parser.add_argument("--max-nodes", type=int, default=200000)
+    args = parser.parse_args()
+    if args.file is not None:
+        solveFile(args.file, args.moves, args.max_nodes)
+    elif args.fen is not None:
+        game = fromFen(args.fen)
+        result = MateSolver(args.max_nodes).solve(game, args.moves)
+        print(f"{result.status} {formatLine(game, result.moves)} ({result.nodes} nodes in {result.seconds:.2f}s)")
+    else:
+        parser.error("give a FEN or --file")
@@ -0,0 +1,106 @@
+from game import Game
+from pieces import Move, Piece, King, Queen, Bishop, Knight, Rook, Pawn, Coordinate
+
+FEN_PIECES: dict[str, type[Piece]] = {"p": Pawn, "n": Knight, "b": Bishop, "r": Rook, "q": Queen, "k": King}
+STARTPOS = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+FILES = "abcdefgh"
+
+def squareName(pos: Coordinate) -> str:
+    """Return the algebraic name of pos, e.g. (7,4) is e1"""
+    return f"{FILES[pos[1]]}{8 - pos[0]}"
+
+def parseSquare(name: str) -> Coordinate:
+    """Return the coordinate of an algebraic square name"""
+    if len(name) != 2 or name[0] not in FILES or name[1] not in "12345678":
+        raise ValueError(f"invalid square {name!r}")
+    return (8 - int(name[1]), FILES.index(name[0]))
+
+def fromFen(fen: str, checkEnabled: bool = True) -> Game:
+    """Return a Game in the position described by a FEN string. Castling rights become the hasMoved attributes of kings and rooks, and an en passant square becomes a double pawn move in moveHistory. Raise ValueError unless each color has exactly one king and the side not to move is not in check"""
+    fields = fen.split()
+    if len(fields) < 4:
+        raise ValueError(f"invalid FEN {fen!r}")
+    placement, side, castling, enPassant = fields[:4]
+    ranks = placement.split("/")
+    if len(ranks) != 8 or side not in ("w", "b"):
+        raise ValueError(f"invalid FEN {fen!r}")
+    game = Game(populate=False, checkEnabled=checkEnabled)
+    for row, rank in enumerate(ranks):
+        col = 0
+        for char in rank:
+            if char.isdigit():
+                col += int(char)
+                continue
+            if char.lower() not in FEN_PIECES or col > 7:
+                raise ValueError(f"invalid FEN {fen!r}")
+            color = "white" if char.isupper() else "black"
+            piece = FEN_PIECES[char.lower()](color)
+            if isinstance(piece, Pawn):
+                piece.hasMoved = row != (6 if color == "white" else 1)
+            elif isinstance(piece, (King, Rook)):
+                piece.hasMoved = True # cleared below for pieces that can still castle
+            game.setSpace(piece, (row,col))
+            col += 1
+        if col != 8:
+            raise ValueError(f"invalid FEN {fen!r}")
+    for right, row, rookCol in (("K",7,7), ("Q",7,0), ("k",0,7), ("q",0,0)):
+        king, rook = game.getSpace((row,4)), game.getSpace((row,rookCol))
+        if right in castling and isinstance(king, King) and isinstance(rook, Rook):
+            king.hasMoved = False
+            rook.hasMoved = False
+    game.turn = "white" if side == "w" else "black"
+    for color in ("white", "black"):
+        if sum(isinstance(p, King) for p in game._pieces(color)) != 1:
+            raise ValueError(f"invalid FEN {fen!r}: {color} needs exactly one king")
+    if game.inCheck("black" if game.turn == "white" else "white"):
+        raise ValueError(f"invalid FEN {fen!r}: side not to move is in check")
+    if enPassant != "-":
+        row, col = parseSquare(enPassant)
+        dr = 1 if row == 5 else -1 # pawn moved from the row beyond the en passant square
+        game.moveHistory.append(Move([(row + dr, col), (row, col), (row - dr, col)], doublePawn="white" if row == 5 else "black"))
+    return game
+
+def toFen(game: Game) -> str:
+    """Return the FEN string describing the position of game"""
+    ranks: list[str] = []
+    for r in range(8):
+        rank, empty = "", 0
+        for c in range(8):
+            piece = game.getSpace((r,c))
+            if piece is None:
+                empty += 1
+                continue
+            if empty:
+                rank += str(empty)
+                empty = 0
+            letter = next(k for k, v in FEN_PIECES.items() if v is type(piece))
+            rank += letter.upper() if piece.color == "white" else letter
+        ranks.append(rank + (str(empty) if empty else ""))
+    castling = ""
+    for right, row, rookCol in (("K",7,7), ("Q",7,0), ("k",0,7), ("q",0,0)):
+        king, rook = game.getSpace((row,4)), game.getSpace((row,rookCol))
+        if isinstance(king, King) and isinstance(rook, Rook) and not king.hasMoved and not rook.hasMoved:
+            castling += right
+    enPassant = "-"
+    if len(game.moveHistory) > 0 and game.moveHistory[-1].doublePawn:
+        enPassant = squareName(game.moveHistory[-1].spaces[1])
+    side = "w" if game.turn == "white" else "b"
+    return f"{'/'.join(ranks)} {side} {castling or '-'} {enPassant} 0 {len(game.moveHistory) // 2 + 1}"
+
+def moveToUci(game: Game, mv: Move) -> str:
+    """Return mv in UCI long algebraic notation, e.g. e2e4 or a7a8q"""
+    promotion = ""
+    piece = game.getSpace(mv.startPos())
+    if isinstance(piece, Pawn) and mv.endPos()[0] in (0, 7):
+        promotion = "q"
+    return squareName(mv.startPos()) + squareName(mv.endPos()) + promotion
+
+def moveFromUci(game: Game, text: str) -> Move:
+    """Return the legal Move of game described in UCI notation. Pawns always promote to a Queen, whatever piece is requested"""
+    start, end = parseSquare(text[0:2]), parseSquare(text[2:4])
+    piece = game.getSpace(start)
+    if piece is not None and piece.color == game.turn:
+        for mv in piece.getMoves():
+            if mv.endPos() == end:
+                return mv
+    raise ValueError(f"illegal move {text!r}")
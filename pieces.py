@@ -1,4 +1,4 @@
-from typing import Optional, TypeAlias, TYPE_CHECKING
+from typing import ClassVar, Optional, TypeAlias, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from game import Game
@@ -34,9 +34,10 @@ class Move:
 
 class Piece:
     """Parent class for all pieces, storing color, location, and whether the piece has moved yet"""
-    CARDINAL_DIRECTIONS = ((1,0),(0,-1),(-1,0),(0,1))
-    DIAGONAL_DIRECTIONS = ((1,1),(1,-1),(-1,-1),(-1,1))
-    ALL_DIRECTIONS = CARDINAL_DIRECTIONS + DIAGONAL_DIRECTIONS
+    CARDINAL_DIRECTIONS: ClassVar[tuple[Coordinate, ...]] = ((1,0),(0,-1),(-1,0),(0,1))
+    DIAGONAL_DIRECTIONS: ClassVar[tuple[Coordinate, ...]] = ((1,1),(1,-1),(-1,-1),(-1,1))
+    ALL_DIRECTIONS: ClassVar[tuple[Coordinate, ...]] = CARDINAL_DIRECTIONS + DIAGONAL_DIRECTIONS
+    SLIDING_DIRECTIONS: ClassVar[tuple[Coordinate, ...]] = () # directions attacked until blocked, set by Bishop, Rook, and Queen
 
     def __init__(self, color: str) -> None:
         """Initialize Piece with its color. _board and pos are set using the setSpace method of Game"""
@@ -59,17 +60,19 @@ class Piece:
         """Return the color that is not this piece's color"""
         return "black" if self.color == "white" else "white"
 
-    def _addIfValid(self, mv: Move, moves: list[Move], allowCapture: bool = True) -> bool:
-        """Add mv to moves if it is in bounds, there are no pieces in the way, and it does not cause check. Return True if the first two conditions are met."""
+    def _addIfValid(self, mv: Move, moves: list[Move], allowCapture: bool = True, checkEnabled: Optional[bool] = None) -> bool:
+        """Add mv to moves if it is in bounds, there are no pieces in the way, and it does not cause check. Return True if the first two conditions are met. checkEnabled overrides the checkEnabled attribute of the board if given"""
         if self._board is None:
             raise RuntimeError("Piece not assigned to board")
+        if checkEnabled is None:
+            checkEnabled = self._board.checkEnabled
         if self._inBounds(mv) and self._moveFree(mv, allowCapture):
-            if not self._board.checkEnabled:
+            if not checkEnabled:
                 moves.append(mv)
             elif not self._board.causesCheck(mv):
                 if not mv.castle:
                     moves.append(mv)
-                elif not self._board.causesCheck(mv.partialCastle()) and not self._board.inCheck(): # only add a castle move if not starting in or moving through check 
+                elif self._board.attackCount(mv.spaces[1], self._oppositeColor()) == 0 and not self._board.inCheck(self.color): # only add a castle move if not starting in or moving through check 
                     moves.append(mv)
             return True # indicates that movesInLine should continue to check spaces
         return False
@@ -90,7 +93,7 @@ class Piece:
         lastSpace = self._board.getSpace(mv.endPos())
         return lastSpace is None or (allowCapture and lastSpace.color == self._oppositeColor())
     
-    def _movesInLine(self, directions: tuple[Coordinate, ...], limitLength: bool = False) -> list[Move]:
+    def _movesInLine(self, directions: tuple[Coordinate, ...], limitLength: bool = False, checkEnabled: Optional[bool] = None) -> list[Move]:
         """Return list of all moves available in directions given as a list of tuples of length 2 with values of -1, 0, or 1"""
         if self.pos is None:
             raise RuntimeError("Piece does not have position")
@@ -103,19 +106,48 @@ class Piece:
                 row += dr
                 col += dc
                 currentMove.append((row,col))
-                if self._addIfValid(Move(currentMove.copy()),moves) == False:
+                if self._addIfValid(Move(currentMove.copy()),moves,checkEnabled=checkEnabled) == False:
                     break
                 if limitLength: # limit move to one space in every direction in case of King
                     break
         return moves
     
-    def getMoves(self) -> list[Move]:
-        """Call getMoves in Piece subclass instead"""
+    def getMoves(self, checkEnabled: Optional[bool] = None) -> list[Move]:
+        """Call getMoves in Piece subclass instead. checkEnabled overrides the checkEnabled attribute of the board if given, so moves can be found without changing the board"""
         raise NotImplementedError
     
+    def getAttacks(self) -> list[Coordinate]:
+        """Return all spaces this piece attacks, including spaces of pieces of either color that block it. Pieces with fixed patterns override this"""
+        if self._board is None:
+            raise RuntimeError("Piece not assigned to board")
+        if self.pos is None:
+            raise RuntimeError("Piece does not have position")
+        attacks: list[Coordinate] = []
+        for dr, dc in self.SLIDING_DIRECTIONS:
+            row = self.pos[0] + dr
+            col = self.pos[1] + dc
+            while 0 <= row <= 7 and 0 <= col <= 7:
+                attacks.append((row,col))
+                if self._board.getSpace((row,col)) is not None:
+                    break
+                row += dr
+                col += dc
+        return attacks
+
+    def _attacksInPattern(self, offsets: tuple[Coordinate, ...]) -> list[Coordinate]:
+        """Return spaces at each of offsets from this piece that are on the board"""
+        if self.pos is None:
+            raise RuntimeError("Piece does not have position")
+        row, col = self.pos
+        return [(row+dr, col+dc) for dr, dc in offsets if 0 <= row+dr <= 7 and 0 <= col+dc <= 7]
+
+    def _new(self) -> "Piece":
+        """Call _new in Piece subclass instead. Subclasses construct themselves directly so compiled builds avoid calling type(self)"""
+        raise NotImplementedError
+
     def copy(self, newBoard: "Game") -> "Piece":
         """Return a copy of self on newBoard"""
-        new = type(self)(self.color)
+        new = self._new()
         new._board = self._board
         new.pos = self.pos
         new.hasMoved = self.hasMoved
@@ -126,40 +158,68 @@ class Piece:
         return f"{type(self).__name__}({self.color},{self.pos})"
 
 class King(Piece):
-    def getMoves(self) -> list[Move]:
+    def _new(self) -> Piece:
+        """Return a new unmoved King of the same color"""
+        return King(self.color)
+
+    def getAttacks(self) -> list[Coordinate]:
+        """Return spaces one step away in every direction"""
+        return self._attacksInPattern(self.ALL_DIRECTIONS)
+
+    def getMoves(self, checkEnabled: Optional[bool] = None) -> list[Move]:
         """Return list of available Moves"""
         if self._board is None:
             raise RuntimeError("Piece not assigned to board")
         if self.pos is None:
             raise RuntimeError("Piece does not have position")
-        moves = self._movesInLine(self.ALL_DIRECTIONS,limitLength=True)
+        moves = self._movesInLine(self.ALL_DIRECTIONS,limitLength=True,checkEnabled=checkEnabled)
         if not self.hasMoved: # add castling moves
             row = self.pos[0]
             leftCorner = self._board.getSpace((row,0))
             rightCorner = self._board.getSpace((row,7))
             if isinstance(leftCorner,Rook) and not leftCorner.hasMoved: # queenside castle
                 queenside = Move([(row,4),(row,3),(row,1),(row,2)], castle = "queenside") # include (row,1) to ensure that all spaces between the rook and king are empty, even if not passed through by King
-                self._addIfValid(queenside,moves)
+                self._addIfValid(queenside,moves,checkEnabled=checkEnabled)
             if isinstance(rightCorner,Rook) and not rightCorner.hasMoved: # kingside castle
                 kingside = Move([(row,4),(row,5),(row,6)], castle = "kingside")
-                self._addIfValid(kingside,moves)
+                self._addIfValid(kingside,moves,checkEnabled=checkEnabled)
         return moves
     
 class Queen(Piece):
-    def getMoves(self) -> list[Move]:
+    SLIDING_DIRECTIONS = Piece.ALL_DIRECTIONS
+
+    def _new(self) -> Piece:
+        """Return a new unmoved Queen of the same color"""
+        return Queen(self.color)
+
+    def getMoves(self, checkEnabled: Optional[bool] = None) -> list[Move]:
         """Return list of available Moves"""
-        return self._movesInLine(self.ALL_DIRECTIONS)
+        return self._movesInLine(self.ALL_DIRECTIONS, checkEnabled=checkEnabled)
     
 class Bishop(Piece):
-    def getMoves(self) -> list[Move]:
+    SLIDING_DIRECTIONS = Piece.DIAGONAL_DIRECTIONS
+
+    def _new(self) -> Piece:
+        """Return a new unmoved Bishop of the same color"""
+        return Bishop(self.color)
+
+    def getMoves(self, checkEnabled: Optional[bool] = None) -> list[Move]:
         """Return list of available Moves"""
-        return self._movesInLine(self.DIAGONAL_DIRECTIONS)
+        return self._movesInLine(self.DIAGONAL_DIRECTIONS, checkEnabled=checkEnabled)
     
 class Knight(Piece):
 
-    L_DIRECTIONS = ((-2,1),(-2,-1),(2,1),(2,-1),(-1,2),(-1,-2),(1,2),(1,-2))
+    L_DIRECTIONS: ClassVar[tuple[Coordinate, ...]] = ((-2,1),(-2,-1),(2,1),(2,-1),(-1,2),(-1,-2),(1,2),(1,-2))
+
+    def _new(self) -> Piece:
+        """Return a new unmoved Knight of the same color"""
+        return Knight(self.color)
 
-    def getMoves(self) -> list[Move]:
+    def getAttacks(self) -> list[Coordinate]:
+        """Return spaces a knight's move away"""
+        return self._attacksInPattern(self.L_DIRECTIONS)
+
+    def getMoves(self, checkEnabled: Optional[bool] = None) -> list[Move]:
         """Return list of available Moves"""
         if self.pos is None:
             raise RuntimeError("Piece does not have position")
@@ -168,16 +228,31 @@ class Knight(Piece):
         col = self.pos[1]
         for dr, dc in self.L_DIRECTIONS:
             candidate = Move([self.pos,(row+dr,col+dc)])
-            self._addIfValid(candidate,moves)
+            self._addIfValid(candidate,moves,checkEnabled=checkEnabled)
         return moves
     
 class Rook(Piece):
-    def getMoves(self) -> list[Move]:
+    SLIDING_DIRECTIONS = Piece.CARDINAL_DIRECTIONS
+
+    def _new(self) -> Piece:
+        """Return a new unmoved Rook of the same color"""
+        return Rook(self.color)
+
+    def getMoves(self, checkEnabled: Optional[bool] = None) -> list[Move]:
         """Return list of available Moves"""
-        return self._movesInLine(self.CARDINAL_DIRECTIONS)
+        return self._movesInLine(self.CARDINAL_DIRECTIONS, checkEnabled=checkEnabled)
     
 class Pawn(Piece):
-    def getMoves(self) -> list[Move]:
+    def _new(self) -> Piece:
+        """Return a new unmoved Pawn of the same color"""
+        return Pawn(self.color)
+
+    def getAttacks(self) -> list[Coordinate]:
+        """Return the spaces diagonally in front of the pawn, which it attacks whether or not they are occupied"""
+        dr = -1 if self.color == 'white' else 1
+        return self._attacksInPattern(((dr,-1),(dr,1)))
+
+    def getMoves(self, checkEnabled: Optional[bool] = None) -> list[Move]:
         """Return list of available Moves"""
         if self.pos is None:
             raise RuntimeError("Piece does not have position")
@@ -187,23 +262,23 @@ class Pawn(Piece):
         dr = -1 if self.color == 'white' else 1
 
         candidate = Move([self.pos, (row + dr, col)]) # single move
-        self._addIfValid(candidate, moves, allowCapture = False)
+        self._addIfValid(candidate, moves, allowCapture = False, checkEnabled = checkEnabled)
 
         if not self.hasMoved: # double move
             candidate = Move([self.pos, (row + dr, col), (row + 2 * dr, col)], doublePawn = self.color)
-            self._addIfValid(candidate, moves, allowCapture = False)
+            self._addIfValid(candidate, moves, allowCapture = False, checkEnabled = checkEnabled)
 
         endPos = (row + dr, col + 1)
         enPassant = self._enPassant(endPos)
         if self._hasPiece(endPos) or enPassant: # capture to right diagonal
             candidate = Move([self.pos, endPos], enPassant=enPassant)
-            self._addIfValid(candidate, moves)
+            self._addIfValid(candidate, moves, checkEnabled = checkEnabled)
 
         endPos = (row + dr, col - 1)
         enPassant = self._enPassant(endPos)
         if self._hasPiece(endPos) or enPassant: # capture to left diagonal
             candidate = Move([self.pos, endPos], enPassant=enPassant)
-            self._addIfValid(candidate, moves)
+            self._addIfValid(candidate, moves, checkEnabled = checkEnabled)
         
         return moves
     
@@ -0,0 +1,84 @@
+import threading
+import time
+from typing import Callable, Optional
+from game import Game
+from pieces import Move, Piece, King, Queen, Bishop, Knight, Rook, Pawn
+
+PIECE_VALUES: dict[type[Piece], int] = {Pawn: 100, Knight: 320, Bishop: 330, Rook: 500, Queen: 900, King: 0}
+MATE = 100000 # score of delivering checkmate, reduced by the number of plies needed
+
+class SearchStopped(Exception):
+    """Raised inside a search to unwind it when it is stopped or out of time"""
+
+def evaluate(game: Game) -> int:
+    """Return material balance in centipawns from the perspective of the color of the current turn"""
+    score = 0
+    for p in game._pieces():
+        score += PIECE_VALUES[type(p)] if p.color == game.turn else -PIECE_VALUES[type(p)]
+    return score
+
+def child(game: Game, mv: Move) -> Game:
+    """Return a copy of game with mv executed, leaving game unchanged"""
+    newBoard = game._copy()
+    newBoard.checkEnabled = True # _copy disables check detection, but legal moves are needed to keep searching
+    newBoard.move(mv, evaluate=False)
+    return newBoard
+
+class Searcher:
+    """Iterative deepening alpha-beta search on copies of a Game. It can be stopped from another thread with stopEvent, or by a deadline from time.monotonic. If infinite is True, finding checkmate does not end the search early"""
+    def __init__(self, game: Game, maxDepth: int = 64, deadline: Optional[float] = None, stopEvent: Optional[threading.Event] = None, infinite: bool = False) -> None:
+        self.game = game
+        self.maxDepth = maxDepth
+        self.infinite = infinite
+        self.deadline = deadline
+        self.stopEvent = stopEvent if stopEvent is not None else threading.Event()
+        self.nodes = 0
+
+    def _checkStop(self) -> None:
+        """Raise SearchStopped if the search has been stopped or run out of time"""
+        if self.stopEvent.is_set() or (self.deadline is not None and time.monotonic() >= self.deadline):
+            raise SearchStopped
+
+    def negamax(self, game: Game, depth: int, alpha: int, beta: int, ply: int) -> int:
+        """Return the score of game searched to depth from the perspective of the color of the current turn"""
+        self.nodes += 1
+        self._checkStop()
+        moves = list(game._moves(game.turn))
+        if len(moves) == 0:
+            return -MATE + ply if game.inCheck() else 0
+        if depth == 0:
+            return evaluate(game)
+        for mv in moves:
+            score = -self.negamax(child(game, mv), depth - 1, -beta, -alpha, ply + 1)
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    def search(self, info: Optional[Callable[[int, int, int, float, Move], None]] = None) -> tuple[Optional[Move], int]:
+        """Search deeper until stopped, out of time, or at maxDepth, and return the best move and its score. After each depth, info is called with depth, score, nodes, elapsed seconds, and best move"""
+        start = time.monotonic()
+        moves = list(self.game._moves(self.game.turn))
+        best: Optional[Move] = None
+        bestScore = 0
+        for depth in range(1, self.maxDepth + 1):
+            if len(moves) == 0:
+                break
+            try:
+                alpha, depthBest = -MATE - 1, moves[0]
+                for mv in moves:
+                    score = -self.negamax(child(self.game, mv), depth - 1, -MATE - 1, -alpha, 1)
+                    if score > alpha:
+                        alpha, depthBest = score, mv
+            except SearchStopped:
+                break
+            best, bestScore = depthBest, alpha
+            moves.remove(depthBest)
+            moves.insert(0, depthBest) # search the best move first at the next depth
+            if info is not None:
+                info(depth, bestScore, self.nodes, time.monotonic() - start, best)
+            if bestScore >= MATE - depth and not self.infinite: # found the fastest checkmate
+                break
+        if best is None and len(moves) > 0: # stopped before finishing the first depth
+            best = moves[0]
+        return best, bestScore
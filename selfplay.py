@@ -0,0 +1,114 @@
+import argparse
+import json
+import multiprocessing
+import random
+import time
+import traceback
+from collections import Counter
+from typing import Optional
+from game import Game
+from pieces import Move, King, Pawn
+from compact import encodeMove
+
+class SelfPlayResult:
+    """Outcome of one self-play game: the seed that produced it, every move played, and why it ended"""
+    def __init__(self, seed: int, moves: list[Move], reason: str, error: str = "") -> None:
+        self.seed = seed
+        self.moves = moves
+        self.reason = reason # checkmate, stalemate, ply limit, invariant, or exception
+        self.error = error # description of the violated invariant or traceback of the exception
+
+    def toJson(self) -> str:
+        """Return a JSON line with enough information to replay the game"""
+        return json.dumps({"seed": self.seed, "reason": self.reason, "error": self.error,
+                           "moves": [repr(mv) for mv in self.moves], "codes": [encodeMove(mv) for mv in self.moves]})
+
+def checkInvariants(game: Game) -> str:
+    """Return a description of the first broken invariant of game, or an empty string if there are none"""
+    kings = {"white": 0, "black": 0}
+    for r in range(8):
+        for c in range(8):
+            piece = game.getSpace((r,c))
+            if piece is None:
+                continue
+            if piece.pos != (r,c):
+                return f"{piece!r} found at {(r,c)}"
+            if piece._board is not game:
+                return f"{piece!r} assigned to another board"
+            if isinstance(piece, King):
+                kings[piece.color] += 1
+    for color, count in kings.items():
+        if count != 1:
+            return f"{count} {color} kings"
+    try:
+        game.checkConsistency()
+    except RuntimeError as e:
+        return str(e)
+    return ""
+
+def _weight(game: Game, mv: Move) -> int:
+    """Return how strongly weighted random play prefers mv: promotions, then captures, then castling"""
+    piece = game.getSpace(mv.startPos())
+    if isinstance(piece, Pawn) and mv.endPos()[0] in (0, 7):
+        return 8
+    if game.getSpace(mv.endPos()) is not None or mv.enPassant:
+        return 4
+    return 2 if mv.castle else 1
+
+def playGame(seed: int, maxPlies: int = 300, weighted: bool = False) -> SelfPlayResult:
+    """Play random legal moves chosen by a generator seeded with seed until the game ends or maxPlies is reached"""
+    rng = random.Random(seed)
+    game = Game()
+    try:
+        while len(game.moveHistory) < maxPlies:
+            moves = list(game._moves(game.turn))
+            if len(moves) == 0:
+                return SelfPlayResult(seed, game.moveHistory, "checkmate" if game.inCheck() else "stalemate")
+            if weighted:
+                mv = rng.choices(moves, [_weight(game, m) for m in moves])[0]
+            else:
+                mv = rng.choice(moves)
+            if isinstance(game.getSpace(mv.endPos()), King):
+                game.moveHistory.append(mv)
+                return SelfPlayResult(seed, game.moveHistory, "invariant", f"{mv!r} captures a king")
+            game.move(mv, evaluate=False) # the next iteration finds whether the game is over
+            error = checkInvariants(game)
+            if error:
+                return SelfPlayResult(seed, game.moveHistory, "invariant", error)
+        return SelfPlayResult(seed, game.moveHistory, "ply limit")
+    except Exception:
+        return SelfPlayResult(seed, game.moveHistory, "exception", traceback.format_exc())
+
+def _playGame(args: tuple[int, int, bool]) -> SelfPlayResult:
+    """Unpack arguments for playGame so it can be used with Pool.imap_unordered"""
+    return playGame(*args)
+
+def run(games: int, startSeed: int = 0, maxPlies: int = 300, weighted: bool = False, processes: Optional[int] = None, failurePath: str = "selfplay_failures.jsonl") -> Counter[str]:
+    """Play games on all cores (or processes of them), print throughput, append failed games to failurePath, and return a count of each end reason"""
+    jobs = [(seed, maxPlies, weighted) for seed in range(startSeed, startSeed + games)]
+    reasons: Counter[str] = Counter()
+    plies = 0
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool, open(failurePath, "a") as failures:
+        for result in pool.imap_unordered(_playGame, jobs):
+            reasons[result.reason] += 1
+            plies += len(result.moves)
+            if result.reason in ("invariant", "exception"):
+                failures.write(result.toJson() + "\n")
+                print(f"seed {result.seed} failed: {result.error.strip().splitlines()[-1]}")
+    elapsed = time.perf_counter() - start
+    print(f"{games} games, {plies} plies in {elapsed:.1f}s ({plies / elapsed:.1f} plies/s)")
+    for reason, count in reasons.most_common():
+        print(f"{reason:>10}: {count} ({count / games:.1%})")
+    return reasons
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play random games headlessly to measure throughput and search for bugs")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--start-seed", type=int, default=0)
+    parser.add_argument("--max-plies", type=int, default=300)
+    parser.add_argument("--weighted", action="store_true", help="prefer promotions, captures, and castling")
+    parser.add_argument("--processes", type=int, default=None, help="number of worker processes [defaults to all cores]")
+    parser.add_argument("--failures", default="selfplay_failures.jsonl", help="file that failed games are appended to")
+    args = parser.parse_args()
+    run(args.games, args.start_seed, args.max_plies, args.weighted, args.processes, args.failures)
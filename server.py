@@ -0,0 +1,202 @@
+import argparse
+import asyncio
+import itertools
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+from game import Game
+from pieces import Move, Coordinate
+
+T = TypeVar("T")
+
+# Line protocol, one command per line with space separated arguments. Coordinates are single digit row and column.
+#   new                      -> ok <id>
+#   click <id> <r> <c>       -> ok [<rc> ...]      highlighted spaces after the click
+#   moves <id>               -> ok [<rcrc> ...]    legal moves for the current turn
+#   move <id> <r> <c> <r> <c> -> ok <status>        status is checkmate, stalemate, or - if the game continues
+#   close <id>               -> ok
+# Any failure is answered with: error <message>. A line longer than the stream limit is answered with an error and closes the connection
+
+class Session:
+    """A Game hosted by the server along with the time it was last used"""
+    def __init__(self, sessionId: int) -> None:
+        self.sessionId = sessionId
+        self.game = Game()
+        self.lock = asyncio.Lock() # commands for one game are executed one at a time
+        self.lastUsed = time.monotonic()
+
+class SessionPool:
+    """Holds up to maxSessions Sessions, evicting any left idle for longer than idleTimeout seconds"""
+    def __init__(self, maxSessions: int = 10000, idleTimeout: float = 300.0) -> None:
+        self.maxSessions = maxSessions
+        self.idleTimeout = idleTimeout
+        self.sessions: dict[int, Session] = {}
+        self._ids = itertools.count(1)
+
+    def open(self) -> Session:
+        """Create a new Session, evicting idle sessions first if the pool is full"""
+        if len(self.sessions) >= self.maxSessions:
+            self.evictIdle()
+        if len(self.sessions) >= self.maxSessions:
+            raise RuntimeError("server full")
+        session = Session(next(self._ids))
+        self.sessions[session.sessionId] = session
+        return session
+
+    def get(self, sessionId: int) -> Session:
+        """Return the Session with sessionId and mark it as used"""
+        session = self.sessions.get(sessionId)
+        if session is None:
+            raise RuntimeError(f"no session {sessionId}")
+        session.lastUsed = time.monotonic()
+        return session
+
+    def close(self, sessionId: int) -> None:
+        """Remove the Session with sessionId"""
+        if self.sessions.pop(sessionId, None) is None:
+            raise RuntimeError(f"no session {sessionId}")
+
+    def evictIdle(self, now: Optional[float] = None) -> int:
+        """Remove sessions idle for longer than idleTimeout that are not executing a command. Return the number removed"""
+        if now is None:
+            now = time.monotonic()
+        idle = [s.sessionId for s in self.sessions.values() if now - s.lastUsed > self.idleTimeout and not s.lock.locked()]
+        for sessionId in idle:
+            del self.sessions[sessionId]
+        return len(idle)
+
+def _click(game: Game, pos: Coordinate) -> list[Coordinate]:
+    """Click pos on game and return the spaces highlighted afterwards"""
+    game.click(pos)
+    return [mv.endPos() for mv in game.visibleMoves]
+
+def _legalMoves(game: Game) -> list[Move]:
+    """Return all legal moves for the color of the current turn"""
+    return list(game._moves(game.turn))
+
+def _playMove(game: Game, start: Coordinate, end: Coordinate) -> Optional[str]:
+    """Execute the legal move from start to end and return the resulting status, or None if there is no such move"""
+    piece = game.getSpace(start)
+    if piece is None or piece.color != game.turn:
+        return None
+    for mv in piece.getMoves():
+        if mv.endPos() == end:
+            game.visibleMoves.clear()
+            game.move(mv)
+            return game.status
+    return None
+
+class GameServer:
+    """asyncio server hosting many concurrent Games. Move generation and status checks run on an executor so one busy game does not stall the event loop, and at most maxPending of them are queued at a time"""
+    def __init__(self, pool: Optional[SessionPool] = None, executor: Optional[Executor] = None, maxPending: int = 64, evictInterval: float = 30.0) -> None:
+        self.pool = pool if pool is not None else SessionPool()
+        self.executor = executor if executor is not None else ThreadPoolExecutor() # Game objects are shared with the workers, so the executor must use threads
+        self.evictInterval = evictInterval
+        self._pending = asyncio.Semaphore(maxPending)
+        self._server: Optional[asyncio.Server] = None
+        self._evictTask: Optional[asyncio.Task[None]] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.Server:
+        """Start listening for connections and evicting idle sessions"""
+        self._server = await asyncio.start_server(self.handle, host, port)
+        self._evictTask = asyncio.create_task(self._evictLoop())
+        return self._server
+
+    async def stop(self) -> None:
+        """Stop listening and shut down the executor"""
+        if self._evictTask is not None:
+            self._evictTask.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer each line received on a connection until it is closed"""
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError: # longer than the stream limit, after which the start of the next line is unknown
+                    writer.write(b"error line too long\n")
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                response = await self.dispatch(line.decode(errors="replace")) # undecodable bytes become an unknown command
+                writer.write((response + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, line: str) -> str:
+        """Execute one protocol command and return the response line"""
+        args = line.split()
+        try:
+            if len(args) == 0:
+                raise RuntimeError("empty command")
+            command, values = args[0], [int(a) for a in args[1:]]
+            if command in ("click", "move") and any(not 0 <= v <= 7 for v in values[1:]): # negative values would otherwise index from the end of the board
+                raise RuntimeError("coordinates must be 0-7")
+            if command == "new" and len(values) == 0:
+                return f"ok {self.pool.open().sessionId}"
+            if command == "close" and len(values) == 1:
+                self.pool.close(values[0])
+                return "ok"
+            if command == "click" and len(values) == 3:
+                spaces = await self._run(values[0], _click, (values[1], values[2]))
+                return " ".join(["ok"] + [f"{r}{c}" for r, c in spaces])
+            if command == "moves" and len(values) == 1:
+                moves = await self._run(values[0], _legalMoves)
+                return " ".join(["ok"] + [_formatMove(mv) for mv in moves])
+            if command == "move" and len(values) == 5:
+                status = await self._run(values[0], _playMove, (values[1], values[2]), (values[3], values[4]))
+                if status is None:
+                    raise RuntimeError("illegal move")
+                return f"ok {status or '-'}"
+            raise RuntimeError(f"unknown command {args[0]}")
+        except ValueError:
+            return "error arguments must be integers"
+        except RuntimeError as e:
+            return f"error {e}"
+
+    async def _run(self, sessionId: int, fn: Callable[..., T], *args: Any) -> T:
+        """Run fn on the game of a session in the executor, waiting if too many calls are already pending"""
+        session = self.pool.get(sessionId)
+        async with session.lock, self._pending:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, fn, session.game, *args)
+        session.lastUsed = time.monotonic()
+        return result
+
+    async def _evictLoop(self) -> None:
+        """Periodically remove idle sessions"""
+        while True:
+            await asyncio.sleep(self.evictInterval)
+            self.pool.evictIdle()
+
+def _formatMove(mv: Move) -> str:
+    """Return mv as four digits: start row, start column, end row, end column"""
+    (r1, c1), (r2, c2) = mv.startPos(), mv.endPos()
+    return f"{r1}{c1}{r2}{c2}"
+
+async def serve(host: str, port: int, maxSessions: int, idleTimeout: float, maxPending: int) -> None:
+    """Run a GameServer until cancelled"""
+    server = GameServer(SessionPool(maxSessions, idleTimeout), maxPending=maxPending)
+    listener = await server.start(host, port)
+    print(f"serving on {host}:{port}")
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host concurrent chess games over a line protocol")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--idle-timeout", type=float, default=300.0, help="seconds before an unused session is evicted")
+    parser.add_argument("--max-pending", type=int, default=64, help="executor jobs allowed in flight before commands wait")
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.max_sessions, args.idle_timeout, args.max_pending))
@@ -0,0 +1,112 @@
+from pieces import Move, Piece, Queen, Pawn, Coordinate
+from game import Game
+from typing import Optional, TypeAlias, Iterator
+
+PieceState: TypeAlias = tuple[type[Piece], str, bool] # piece type, color, hasMoved
+Row: TypeAlias = tuple[Optional[PieceState], ...]
+
+class History:
+    """Immutable linked chain of Moves. Each link points to the history before it, so positions branching from one another share their common moves"""
+    __slots__ = ("move", "parent", "length") # many thousands of these may be alive at once
+
+    def __init__(self, move: Move, parent: Optional["History"]) -> None:
+        self.move = move
+        self.parent = parent
+        self.length: int = 1 if parent is None else parent.length + 1
+
+    def __iter__(self) -> Iterator[Move]:
+        """Iterate over moves from the first move to the most recent"""
+        moves: list[Move] = []
+        link: Optional[History] = self
+        while link is not None:
+            moves.append(link.move)
+            link = link.parent
+        return reversed(moves)
+
+    def __len__(self) -> int:
+        """Return number of moves in the chain"""
+        return self.length
+
+class Position:
+    """Immutable snapshot of a Game. Rows are tuples, so a Position created by play shares every row the move did not touch with its parent"""
+    __slots__ = ("_rows", "turn", "_history")
+
+    def __init__(self, rows: tuple[Row, ...], turn: str = "white", history: Optional[History] = None) -> None:
+        self._rows = rows
+        self.turn = turn
+        self._history = history
+
+    @classmethod
+    def fromGame(cls, game: Game) -> "Position":
+        """Return a snapshot of the current state of game"""
+        rows = tuple(tuple(None if p is None else (type(p), p.color, p.hasMoved) for p in row) for row in game._board)
+        history: Optional[History] = None
+        for mv in game.moveHistory:
+            history = History(mv, history)
+        return cls(rows, game.turn, history)
+
+    def getSpace(self, pos: Coordinate) -> Optional[PieceState]:
+        """Return state of the piece at pos, or None if the space is empty"""
+        return self._rows[pos[0]][pos[1]]
+
+    def lastMove(self) -> Optional[Move]:
+        """Return the most recent Move, or None if no moves have been made"""
+        return None if self._history is None else self._history.move
+
+    def moveHistory(self) -> list[Move]:
+        """Return a list of all moves made, oldest first"""
+        return [] if self._history is None else list(self._history)
+
+    def play(self, mv: Move) -> "Position":
+        """Return a new Position with Move mv executed, handling special cases the same way as Game.move"""
+        piece = self.getSpace(mv.startPos())
+        if piece is None:
+            raise RuntimeError("Tried to move from empty space")
+        pieceType, color, _ = piece
+        changes: dict[Coordinate, Optional[PieceState]] = {mv.endPos(): (pieceType, color, True), mv.startPos(): None}
+
+        if mv.castle != "": # move rook if castle
+            row = 7 if color == "white" else 0
+            oldCol,newCol = (7,5) if mv.castle == "kingside" else (0,3)
+            rook = self.getSpace((row,oldCol))
+            assert rook is not None # rook should never be None
+            changes[(row,newCol)] = (rook[0], rook[1], True)
+            changes[(row,oldCol)] = None
+
+        if mv.enPassant: # remove pawn if en passant
+            lastMove = self.lastMove()
+            assert lastMove is not None # en passant always follows a double pawn move
+            changes[lastMove.endPos()] = None
+
+        oppRow = 0 if color == "white" else 7
+        if pieceType is Pawn and mv.endPos()[0] == oppRow: # pawn promotion
+            changes[mv.endPos()] = (Queen, color, False)
+
+        rows = list(self._rows)
+        for r in {pos[0] for pos in changes}: # rebuild only the rows that changed
+            newRow = list(rows[r])
+            for (changedRow, col), content in changes.items():
+                if changedRow == r:
+                    newRow[col] = content
+            rows[r] = tuple(newRow)
+        turn = "black" if self.turn == "white" else "white"
+        return Position(tuple(rows), turn, History(mv, self._history))
+
+    def toGame(self, checkEnabled: bool = True) -> Game:
+        """Return a new playable Game in the state of this Position"""
+        game = Game(populate=False, checkEnabled=checkEnabled)
+        for r in range(8):
+            for c in range(8):
+                state = self._rows[r][c]
+                if state is not None:
+                    pieceType, color, hasMoved = state
+                    piece = pieceType(color)
+                    piece.hasMoved = hasMoved
+                    game.setSpace(piece, (r,c))
+        game.turn = self.turn
+        game.moveHistory = self.moveHistory()
+        return game
+
+    def legalMoves(self) -> list[Move]:
+        """Return list of all legal moves for the color of the current turn"""
+        return list(self.toGame()._moves(self.turn))
@@ -1,6 +1,29 @@
 import unittest
 import game as g
 import pieces as p
+import snapshot as s
+import compact as c
+import selfplay
+import notation
+import search
+import uci
+import io
+import mate
+import tempfile
+import contextlib
+import os
+import archive
+import analysis
+import sys
+import concurrent.futures
+import server
+import loadgen
+import asyncio
+import json
+import random
+import subprocess
+import benchmark
+import build
 from typing import Optional, Any
 
 class TestGame(unittest.TestCase):
@@ -158,6 +181,43 @@ class TestGame(unittest.TestCase):
         mv = p.Move([(4,3),(3,4)])
         self.assertFalse(self.emptyCheck.causesCheck(mv))
 
+    def testCausesCheckPinned(self):
+        """Test causesCheck for pieces pinned to their king and kings moving along the line of an attacker"""
+        p1 = p.King("white")
+        p2 = p.Bishop("white")
+        p3 = p.Queen("black")
+        p4 = p.King("black")
+        p5 = p.Rook("black")
+        self.placePieces([p1,p2,p3,p4,p5],[(4,4),(5,5),(7,7),(0,0),(0,3)], board=self.emptyCheck)
+        self.assertTrue(self.emptyCheck.causesCheck(p.Move([(5,5),(4,6)]))) # leaves the line of the queen
+        self.assertFalse(self.emptyCheck.causesCheck(p.Move([(5,5),(6,6)]))) # stays between the king and queen
+        self.assertFalse(self.emptyCheck.causesCheck(p.Move([(5,5),(7,7)]))) # captures the queen
+        self.assertTrue(self.emptyCheck.causesCheck(p.Move([(4,4),(4,3)]))) # moves into the line of the rook
+        self.emptyCheck.setSpace(None, (0,3))
+        self.emptyCheck.setSpace(p5, (0,4))
+        self.assertEqual(1, self.emptyCheck.attackCount((4,4), "black"))
+        self.assertEqual(0, self.emptyCheck.attackCount((5,4), "black")) # the king blocks the rook
+        self.assertTrue(self.emptyCheck.causesCheck(p.Move([(4,4),(5,4)]))) # moves away along the line of the rook
+        self.assertFalse(self.emptyCheck.causesCheck(p.Move([(4,4),(4,3)])))
+
+    def testAttackMaps(self):
+        """Test that attack maps follow moves, captures, and castling and agree with the board"""
+        self.assertEqual(3, self.game.attackCount((5,2), "white")) # two pawns and a knight
+        self.assertEqual(0, self.game.attackCount((4,4), "white"))
+        self.assertEqual(1, self.game.attackCount((7,1), "white")) # defended by the rook
+        rng = random.Random(7)
+        for _ in range(80):
+            moves = list(self.game._moves(self.game.turn))
+            if len(moves) == 0:
+                break
+            self.game.move(rng.choice(moves))
+            self.game.checkConsistency()
+            self.game._copy().checkConsistency()
+        for mv in self.game._moves(self.game.turn, checkEnabled=False): # agrees with making each move on a copy
+            newBoard = self.game._copy()
+            newBoard.move(mv)
+            self.assertEqual(newBoard.inCheck(self.game.turn), self.game.causesCheck(mv))
+
     def testInCheck(self):
         """Test inCheck method"""
         p1 = p.King("black")
@@ -189,6 +249,77 @@ class TestGame(unittest.TestCase):
         self.emptyCheck.turn = "white"
         self.assertEqual("", self.emptyCheck.gameOver())
 
+    def testSeek(self):
+        """Test that seek restores the same position as replaying moves from the start"""
+        moves = selfplay.playGame(1, maxPlies=12).moves
+        game = g.Game(checkpointInterval=5)
+        for mv in moves:
+            game.move(mv, evaluate=False)
+        self.assertEqual([0, 5, 10], list(game._checkpoints))
+        for ply in range(len(moves) + 1):
+            replayed = g.Game()
+            for mv in moves[:ply]:
+                replayed.move(mv, evaluate=False)
+            sought = game.seek(ply)
+            self.assertEqual(c.CompactGame.fromGame(replayed).board, c.CompactGame.fromGame(sought).board)
+            self.assertEqual(replayed.turn, sought.turn)
+            self.assertEqual(moves[:ply], sought.moveHistory)
+        self.assertEqual(12, len(game.moveHistory))
+        with self.assertRaises(ValueError):
+            game.seek(13)
+        with self.assertRaises(ValueError):
+            game.seek(-1)
+        sought = g.Game().seek(0) # no moves made, so no checkpoint saved yet
+        self.assertEqual(c.CompactGame.fromGame(g.Game()).board, c.CompactGame.fromGame(sought).board)
+        self.assertEqual(0, len(sought.moveHistory))
+        unsaved = g.Game(checkpointInterval=0)
+        for mv in moves:
+            unsaved.move(mv, evaluate=False)
+        self.assertEqual(c.CompactGame.fromGame(game).board, c.CompactGame.fromGame(unsaved.seek(12)).board) # the current position needs no checkpoint
+
+    def testSeekEnPassant(self):
+        """Test that en passant remains available after seeking to the ply after a double pawn move"""
+        game = notation.fromFen("4k3/1p6/8/P7/8/8/8/4K3 b - - 0 1")
+        game.move(p.Move([(1,1),(2,1),(3,1)], doublePawn="black"))
+        sought = game.seek(1)
+        self.assertIn((2,1), [m.endPos() for m in sought.getSpace((3,0)).getMoves()]) # type: ignore
+
+    def testPieceIndex(self):
+        """Test that the piece and king indexes follow captures, castling, en passant, and promotion"""
+        self.assertEqual(16, len(list(self.game._pieces("white"))))
+        self.assertEqual(32, len(list(self.game._pieces())))
+        self.assertIs(self.game.getSpace((0,4)), self.game._kings["black"])
+        king, rook, pawn1, pawn2, pawn3 = p.King("white"), p.Rook("white"), p.Pawn("white"), p.Pawn("black"), p.Pawn("white")
+        blackKing, knight = p.King("black"), p.Knight("black")
+        self.placePieces([king, rook, pawn1, pawn2, pawn3, blackKing, knight], [(7,4),(7,7),(3,1),(1,0),(1,6),(0,4),(0,7)])
+        moves = [p.Move([(7,4),(7,5),(7,6)], castle="kingside"), p.Move([(1,0),(2,0),(3,0)], doublePawn="black"),
+                 p.Move([(3,1),(2,0)], enPassant=True), p.Move([(0,4),(1,4)]), p.Move([(1,6),(0,7)])]
+        for mv in moves:
+            self.empty.move(mv)
+            self.empty.checkConsistency()
+        self.assertNotIn(pawn2, list(self.empty._pieces()))
+        self.assertNotIn(knight, list(self.empty._pieces()))
+        self.assertNotIn(pawn3, list(self.empty._pieces()))
+        self.assertIsInstance(self.empty.getSpace((0,7)), p.Queen)
+        self.assertEqual(4, len(list(self.empty._pieces("white"))))
+        self.assertIs(blackKing, self.empty._kings["black"])
+        self.empty._copy().checkConsistency()
+        self.empty.setSpace(None, (1,4))
+        self.assertNotIn("black", self.empty._kings)
+        with self.assertRaises(RuntimeError):
+            self.empty.inCheck("black")
+
+    def testCheckConsistency(self):
+        """Test that checkConsistency finds indexes that disagree with the board"""
+        self.game.checkConsistency()
+        self.game._board[4][4] = p.Rook("white") # bypass setSpace
+        with self.assertRaises(RuntimeError):
+            self.game.checkConsistency()
+        self.game._board[4][4] = None
+        del self.game._kings["white"]
+        with self.assertRaises(RuntimeError):
+            self.game.checkConsistency()
+
 class TestMove(unittest.TestCase):
 
     def setUp(self):
@@ -545,5 +676,521 @@ class TestPawn(TestPieceFactory, unittest.TestCase):
         expected.append((2,1))
         self.assertMoves(p1, expected)
 
+class TestPosition(unittest.TestCase):
+
+    def setUp(self):
+        self.game = g.Game()
+        self.position = s.Position.fromGame(self.game)
+
+    def assertSameBoard(self, game: g.Game, position: s.Position):
+        """Assert that every space of game holds a piece matching the state stored in position"""
+        for r in range(8):
+            for c in range(8):
+                piece = game.getSpace((r,c))
+                state = None if piece is None else (type(piece), piece.color, piece.hasMoved)
+                self.assertEqual(state, position.getSpace((r,c)))
+        self.assertEqual(game.turn, position.turn)
+        self.assertEqual(game.moveHistory, position.moveHistory())
+
+    def testFromGame(self):
+        """Test fromGame and toGame methods"""
+        self.assertSameBoard(self.game, self.position)
+        newGame = self.position.toGame()
+        self.assertSameBoard(newGame, self.position)
+        self.assertIs(newGame, newGame.getSpace((0,0))._board) # type: ignore
+        self.assertEqual((0,0), newGame.getSpace((0,0)).pos) # type: ignore
+
+    def testPlay(self):
+        """Test that play returns a new Position sharing unchanged rows and history with its parent"""
+        mv = p.Move([(6,4),(5,4),(4,4)], doublePawn="white")
+        child = self.position.play(mv)
+        self.assertEqual("black", child.turn)
+        self.assertEqual(None, self.position.getSpace((4,4)))
+        self.assertEqual((p.Pawn, "white", True), child.getSpace((4,4)))
+        for r in [0,1,2,3,5,7]:
+            self.assertIs(self.position._rows[r], child._rows[r])
+        grandchild = child.play(p.Move([(1,0),(2,0)]))
+        self.assertIs(child._history, grandchild._history.parent) # type: ignore
+        self.assertEqual([mv], child.moveHistory())
+        self.assertEqual(2, len(grandchild.moveHistory()))
+        with self.assertRaises(RuntimeError):
+            child.play(p.Move([(4,0),(3,0)]))
+
+    def testPlaySpecialMoves(self):
+        """Test that play handles castling, en passant, and promotion the same as Game.move"""
+        game = g.Game(populate=False, checkEnabled=False)
+        pieces: list[p.Piece] = [p.King("white"), p.Rook("white"), p.Pawn("white"), p.Pawn("black"), p.Pawn("white")]
+        for piece, pos in zip(pieces, [(7,4),(7,7),(3,1),(1,0),(1,7)]):
+            game.setSpace(piece, pos)
+        position = s.Position.fromGame(game)
+        moves = [p.Move([(7,4),(7,5),(7,6)], castle="kingside"), p.Move([(1,0),(2,0),(3,0)], doublePawn="black"),
+                 p.Move([(3,1),(2,0)], enPassant=True), p.Move([(1,7),(0,7)])]
+        for mv in moves:
+            game.move(mv)
+            position = position.play(mv)
+            self.assertSameBoard(game, position)
+
+    def testLegalMoves(self):
+        """Test legalMoves method"""
+        self.assertEqual(20, len(self.position.legalMoves()))
+
+class TestGameServer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = server.GameServer(server.SessionPool(maxSessions=2, idleTimeout=60))
+        listener = await self.server.start("127.0.0.1", 0)
+        self.port = listener.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        await self.server.stop()
+
+    async def send(self, line: str) -> str:
+        """Send a command to the server and return the response line"""
+        self.writer.write((line + "\n").encode())
+        return (await self.reader.readline()).decode().strip()
+
+    async def testCommands(self):
+        """Test each command of the line protocol"""
+        self.assertEqual("ok 1", await self.send("new"))
+        self.assertEqual(21, len((await self.send("moves 1")).split()))
+        self.assertEqual("ok 54 44", await self.send("click 1 6 4"))
+        self.assertEqual("ok", await self.send("click 1 4 4"))
+        self.assertEqual("ok -", await self.send("move 1 1 4 3 4"))
+        self.assertEqual("error illegal move", await self.send("move 1 1 4 3 4"))
+        self.assertEqual("ok", await self.send("close 1"))
+        self.assertEqual("error no session 1", await self.send("moves 1"))
+        self.assertEqual("error unknown command foo", await self.send("foo"))
+        self.assertEqual("error arguments must be integers", await self.send("moves x"))
+        self.assertEqual("error coordinates must be 0-7", await self.send("click 1 9 9"))
+        self.assertEqual("error coordinates must be 0-7", await self.send("click 1 -2 4"))
+        self.assertEqual("error coordinates must be 0-7", await self.send("move 1 6 4 4 8"))
+        self.writer.write(b"\xff\xfe\n")
+        self.assertTrue((await self.reader.readline()).startswith(b"error unknown command"))
+        self.assertEqual("ok 2", await self.send("new")) # the connection is still open
+        self.assertEqual("error line too long", await self.send("x" * 100000))
+        self.assertEqual(b"", await self.reader.readline())
+
+    async def testCheckmate(self):
+        """Test that move reports the end of the game"""
+        await self.send("new")
+        for mv in ["6 5 5 5", "1 4 3 4", "6 6 4 6"]:
+            self.assertEqual("ok -", await self.send(f"move 1 {mv}"))
+        self.assertEqual("ok checkmate", await self.send("move 1 0 3 4 7"))
+
+    async def testPool(self):
+        """Test session limit and idle eviction"""
+        pool = self.server.pool
+        await self.send("new")
+        await self.send("new")
+        self.assertEqual("error server full", await self.send("new"))
+        self.assertEqual(0, pool.evictIdle())
+        self.assertEqual(2, pool.evictIdle(now=pool.get(2).lastUsed + 61))
+        self.assertEqual("ok 3", await self.send("new"))
+
+    async def testLoad(self):
+        """Test that the load generator plays games against the server"""
+        latencies = await loadgen.runLoad("127.0.0.1", self.port, sessions=2, plies=3)
+        self.assertEqual(6, len(latencies))
+        self.assertLessEqual(loadgen.percentile(latencies, 0.5), loadgen.percentile(latencies, 0.99))
+
+class TestCompactGame(unittest.TestCase):
+
+    def setUp(self):
+        self.game = g.Game(populate=False, checkEnabled=False)
+        pieces: list[p.Piece] = [p.King("white"), p.Rook("white"), p.Pawn("white"), p.Pawn("black"), p.Pawn("white"), p.King("black")]
+        for piece, pos in zip(pieces, [(7,4),(7,7),(3,1),(1,0),(1,7),(0,4)]):
+            self.game.setSpace(piece, pos)
+        self.moves = [p.Move([(7,4),(7,5),(7,6)], castle="kingside"), p.Move([(1,0),(2,0),(3,0)], doublePawn="black"),
+                      p.Move([(3,1),(2,0)], enPassant=True), p.Move([(0,4),(1,4)]), p.Move([(1,7),(0,7)])]
+
+    def assertSameGame(self, expected: g.Game, actual: g.Game):
+        """Assert that two games have matching pieces, turn, and move history"""
+        for r in range(8):
+            for col in range(8):
+                e, a = expected.getSpace((r,col)), actual.getSpace((r,col))
+                self.assertEqual(repr(e), repr(a))
+                if e is not None and a is not None:
+                    self.assertEqual(e.hasMoved, a.hasMoved)
+        self.assertEqual(expected.turn, actual.turn)
+        self.assertEqual([repr(m) + str(m.spaces) for m in expected.moveHistory], [repr(m) + str(m.spaces) for m in actual.moveHistory])
+
+    def testEncodePiece(self):
+        """Test encodePiece and decodePiece functions"""
+        self.assertEqual(0, c.encodePiece(None))
+        self.assertIsNone(c.decodePiece(0))
+        for pieceType in c.PIECE_TYPES:
+            for color in ["white", "black"]:
+                for hasMoved in [False, True]:
+                    piece = pieceType(color)
+                    piece.hasMoved = hasMoved
+                    decoded = c.decodePiece(c.encodePiece(piece))
+                    self.assertIsInstance(decoded, pieceType)
+                    self.assertEqual(color, decoded.color) # type: ignore
+                    self.assertEqual(hasMoved, decoded.hasMoved) # type: ignore
+
+    def testEncodeMove(self):
+        """Test that decodeMove rebuilds every space and flag of moves generated by pieces"""
+        game = g.Game()
+        moves = list(game._moves()) + self.moves + [p.Move([(7,4),(7,3),(7,1),(7,2)], castle="queenside")]
+        for mv in moves:
+            decoded = c.decodeMove(c.encodeMove(mv))
+            self.assertEqual(mv.spaces, decoded.spaces)
+            self.assertEqual(repr(mv), repr(decoded))
+
+    def testMove(self):
+        """Test that CompactGame.move matches Game.move including special cases"""
+        compact = c.CompactGame.fromGame(self.game)
+        for mv in self.moves:
+            self.game.move(mv)
+            compact.move(mv)
+            self.assertSameGame(self.game, compact.toGame())
+        with self.assertRaises(RuntimeError):
+            compact.move(p.Move([(4,4),(3,4)]))
+
+    def testRoundTrip(self):
+        """Test fromGame and toGame keep en passant available"""
+        for mv in self.moves[:2]:
+            self.game.move(mv)
+        compact = c.CompactGame.fromGame(self.game)
+        self.assertEqual(64, len(compact.board))
+        self.assertEqual(2, len(compact.history))
+        newGame = compact.toGame()
+        self.assertSameGame(self.game, newGame)
+        self.assertIn((2,0), [m.endPos() for m in newGame.getSpace((3,1)).getMoves()]) # type: ignore
+
+class TestSelfPlay(unittest.TestCase):
+
+    def testPlayGame(self):
+        """Test that games are reproducible from their seed and stop at the ply limit"""
+        result = selfplay.playGame(3, maxPlies=6)
+        self.assertEqual("ply limit", result.reason)
+        self.assertEqual(6, len(result.moves))
+        again = selfplay.playGame(3, maxPlies=6)
+        self.assertEqual([repr(m) for m in result.moves], [repr(m) for m in again.moves])
+        weighted = selfplay.playGame(3, maxPlies=6, weighted=True)
+        self.assertEqual("ply limit", weighted.reason)
+
+    def testCheckInvariants(self):
+        """Test checkInvariants method"""
+        game = g.Game()
+        self.assertEqual("", selfplay.checkInvariants(game))
+        game.getSpace((6,0)).pos = (5,0) # type: ignore
+        self.assertEqual("Pawn(white,(5, 0)) found at (6, 0)", selfplay.checkInvariants(game))
+        game.setSpace(p.Pawn("white"), (6,0))
+        game.setSpace(None, (0,4))
+        self.assertEqual("0 black kings", selfplay.checkInvariants(game))
+
+    def testToJson(self):
+        """Test that failed games record moves that can be decoded"""
+        mv = p.Move([(6,4),(5,4),(4,4)], doublePawn="white")
+        result = selfplay.SelfPlayResult(7, [mv], "exception", "error")
+        record = json.loads(result.toJson())
+        self.assertEqual(7, record["seed"])
+        self.assertEqual(repr(mv), repr(c.decodeMove(record["codes"][0])))
+
+class TestNotation(unittest.TestCase):
+
+    def testFen(self):
+        """Test fromFen and toFen functions"""
+        game = notation.fromFen(notation.STARTPOS)
+        start = g.Game()
+        for r in range(8):
+            for col in range(8):
+                self.assertEqual(repr(start.getSpace((r,col))), repr(game.getSpace((r,col))))
+        self.assertEqual(notation.STARTPOS, notation.toFen(game))
+        fen = "r3k2r/8/8/3pP3/8/8/8/R3K2R w Kq d6 0 1"
+        game = notation.fromFen(fen)
+        self.assertEqual(fen, notation.toFen(game))
+        self.assertTrue(game.getSpace((0,0)).hasMoved is False and game.getSpace((0,7)).hasMoved is True) # type: ignore
+        self.assertIn((2,3), [m.endPos() for m in game.getSpace((3,4)).getMoves()]) # type: ignore
+        for invalid in ["", "8/8/8 w - -", "9/8/8/8/8/8/8/8 w - -", "8/8/8/8/8/8/8/8 x - -"]:
+            with self.assertRaises(ValueError):
+                notation.fromFen(invalid)
+
+    def testUciMoves(self):
+        """Test moveToUci and moveFromUci functions"""
+        game = notation.fromFen("4k3/P7/8/8/8/8/8/4K2R w K - 0 1")
+        castle = notation.moveFromUci(game, "e1g1")
+        self.assertEqual("kingside", castle.castle)
+        promotion = notation.moveFromUci(game, "a7a8q")
+        self.assertEqual("a7a8q", notation.moveToUci(game, promotion))
+        self.assertEqual((7,4), notation.parseSquare("e1"))
+        with self.assertRaises(ValueError):
+            notation.moveFromUci(game, "e8e7")
+
+class TestUci(unittest.TestCase):
+
+    def setUp(self):
+        self.output = io.StringIO()
+        self.engine = uci.UciEngine(self.output)
+
+    def testSearchMate(self):
+        """Test that search finds checkmate in one"""
+        game = notation.fromFen("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+        best, score = search.Searcher(game, maxDepth=2).search()
+        self.assertEqual("a1a8", notation.moveToUci(game, best)) # type: ignore
+        self.assertEqual(search.MATE - 1, score)
+
+    def testPosition(self):
+        """Test position command with moves"""
+        self.engine.handle("position startpos moves e2e4 e7e5 g1f3")
+        self.assertEqual("rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 0 2", notation.toFen(self.engine.game))
+        self.engine.handle("position fen 6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1 moves a1a2")
+        self.assertEqual("black", self.engine.game.turn)
+        self.engine.handle("position startpos moves e2e5")
+        self.assertIn("info string illegal move 'e2e5'", self.output.getvalue())
+        self.engine.handle("position fen 8/8/8/8/8/8/8/4K3 w - - 0 1")
+        self.assertIn("black needs exactly one king", self.output.getvalue())
+        self.engine.handle("position fen 4k3/8/8/8/8/8/8/4R1K1 w - - 0 1")
+        self.assertIn("side not to move is in check", self.output.getvalue())
+        self.assertEqual("black", self.engine.game.turn) # invalid positions leave the game unchanged
+
+    def testGo(self):
+        """Test go command with a depth limit"""
+        self.assertTrue(self.engine.handle("uci"))
+        self.engine.handle("position fen 6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+        self.engine.handle("go depth 2")
+        self.engine._thread.join() # type: ignore
+        lines = self.output.getvalue().splitlines()
+        self.assertEqual("uciok", lines[2])
+        self.assertTrue(lines[3].startswith("info depth 1 score mate 1 nodes"))
+        self.assertEqual("bestmove a1a8", lines[-1])
+
+    def testStop(self):
+        """Test that isready and stop are answered during an infinite search"""
+        self.engine.handle("go infinite")
+        self.engine.handle("isready")
+        self.assertIn("readyok", self.output.getvalue())
+        self.assertFalse(self.engine.handle("quit"))
+        self.assertIsNone(self.engine._thread)
+        self.assertTrue(self.output.getvalue().splitlines()[-1].startswith("bestmove "))
+
+    def testInfiniteWaitsForStop(self):
+        """Test that an infinite search that finds checkmate waits for stop before sending bestmove"""
+        self.engine.handle("position fen 6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+        self.engine.handle("go infinite depth 2")
+        self.engine._thread.join(timeout=0.5) # type: ignore
+        self.assertNotIn("bestmove", self.output.getvalue())
+        self.engine.handle("stop")
+        self.assertEqual("bestmove a1a8", self.output.getvalue().splitlines()[-1])
+
+    def testSearchFailureSendsBestmove(self):
+        """Test that bestmove is sent even if the search raises"""
+        self.engine.game = g.Game(populate=False) # no black king, which fromFen would reject
+        self.engine.game.setSpace(p.King("white"), (7,4))
+        with contextlib.redirect_stderr(io.StringIO()) as errors: # traceback of the search thread
+            self.engine.handle("go depth 2")
+            self.engine._thread.join() # type: ignore
+        self.assertIn("No black king", errors.getvalue())
+        self.assertEqual("bestmove 0000", self.output.getvalue().splitlines()[-1])
+
+class TestMateSolver(unittest.TestCase):
+
+    LADDER = "7k/8/8/8/8/8/R7/1R4K1 w - - 0 1"
+
+    def testMateInOne(self):
+        """Test solving a back rank mate"""
+        game = notation.fromFen("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+        result = mate.MateSolver().solve(game, 1)
+        self.assertEqual("mate", result.status)
+        self.assertEqual("a1a8", mate.formatLine(game, result.moves))
+
+    def testMateInTwo(self):
+        """Test that the mating line includes the defender's reply and that no shorter mate is found"""
+        game = notation.fromFen(self.LADDER)
+        result = mate.MateSolver().solve(game, 2)
+        self.assertEqual("mate", result.status)
+        self.assertEqual("a2a7 h8g8 b1b8", mate.formatLine(game, result.moves))
+        self.assertEqual("no mate", mate.MateSolver().solve(game, 1).status)
+        self.assertEqual(self.LADDER, notation.toFen(game))
+
+    def testNodeLimit(self):
+        """Test that the solver gives up once its node table is full"""
+        result = mate.MateSolver(maxNodes=10).solve(notation.fromFen(self.LADDER), 2)
+        self.assertEqual("unknown", result.status)
+        self.assertEqual([], result.moves)
+
+    def testSolveFile(self):
+        """Test batch mode with a move count override"""
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write(f"# comment\n{self.LADDER}\n{self.LADDER};1\n")
+        self.addCleanup(os.remove, f.name)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            results = mate.solveFile(f.name, 2, 1000)
+        self.assertEqual(["mate", "no mate"], [r.status for r in results])
+        self.assertIn("positions/s", output.getvalue())
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "games.arc")
+        self.games = [g.Game()]
+        for seed in [1, 2]:
+            game = g.Game()
+            for mv in selfplay.playGame(seed, maxPlies=8).moves:
+                game.move(mv, evaluate=False)
+            self.games.append(game)
+        mated = notation.fromFen(notation.STARTPOS)
+        for text in ["f2f3", "e7e5", "g2g4", "d8h4"]:
+            with contextlib.redirect_stdout(io.StringIO()):
+                mated.move(notation.moveFromUci(mated, text))
+        self.games.append(mated)
+
+    def assertSameGame(self, expected: g.Game, actual: g.Game):
+        """Assert that two games have the same board, turn, and encoded moves"""
+        self.assertEqual(c.CompactGame.fromGame(expected).board, c.CompactGame.fromGame(actual).board)
+        self.assertEqual(expected.turn, actual.turn)
+        self.assertEqual([c.encodeMove(m) for m in expected.moveHistory], [c.encodeMove(m) for m in actual.moveHistory])
+
+    def testRoundTrip(self):
+        """Test writing games and loading each one by index"""
+        with archive.ArchiveWriter(self.path) as writer:
+            for i, game in enumerate(self.games):
+                self.assertEqual(i, writer.add(game))
+        with archive.ArchiveReader(self.path) as reader:
+            self.assertEqual(4, len(reader))
+            for i in [3, 0, 2, 1]:
+                self.assertSameGame(self.games[i], reader.load(i))
+            self.assertEqual("checkmate", reader.load(3).status)
+            self.assertEqual("", reader.result(1))
+            self.assertEqual(2, len(list(reader.games(1, 3))))
+            with self.assertRaises(IndexError):
+                reader.load(4)
+
+    def testAppend(self):
+        """Test adding games to an existing archive"""
+        with archive.ArchiveWriter(self.path) as writer:
+            writer.add(self.games[1])
+        with archive.ArchiveWriter(self.path, append=True) as writer:
+            self.assertEqual(1, writer.add(self.games[2]))
+        with archive.ArchiveReader(self.path) as reader:
+            loaded = list(reader.games())
+        self.assertEqual(2, len(loaded))
+        self.assertSameGame(self.games[1], loaded[0])
+        self.assertSameGame(self.games[2], loaded[1])
+
+    def testInterruptedAppend(self):
+        """Test that appending keeps stored bytes, and that games already stored survive an interrupted writer"""
+        with archive.ArchiveWriter(self.path) as writer:
+            writer.add(self.games[1])
+        with open(self.path, "rb") as f:
+            before = f.read()
+        writer = archive.ArchiveWriter(self.path, append=True)
+        writer.add(self.games[2])
+        writer._file.write(b"CHESSIDX") # stop partway through the index, as if the process died
+        writer._file.close()
+        with open(self.path, "rb") as f:
+            self.assertTrue(f.read().startswith(before))
+        with archive.ArchiveReader(self.path) as reader:
+            self.assertEqual(1, len(reader))
+            self.assertSameGame(self.games[1], reader.load(0))
+        with archive.ArchiveWriter(self.path, append=True) as writer:
+            self.assertEqual(1, writer.add(self.games[3]))
+        with archive.ArchiveReader(self.path) as reader:
+            self.assertEqual(2, len(reader))
+            self.assertSameGame(self.games[3], reader.load(1))
+
+    def testRejectsOtherStarts(self):
+        """Test that games not starting from the standard position are not archived"""
+        fen = notation.fromFen("4k3/8/8/8/8/8/4P3/4K3 w - - 0 1")
+        fen.move(p.Move([(6,4),(5,4)]), evaluate=False)
+        enPassant = notation.fromFen("rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2")
+        with archive.ArchiveWriter(self.path) as writer:
+            for game in [fen, enPassant, notation.fromFen("4k3/8/8/8/8/8/8/4K3 w - - 0 1")]:
+                with self.assertRaises(ValueError):
+                    writer.add(game)
+            self.assertEqual(0, writer.add(notation.fromFen(notation.STARTPOS)))
+            self.assertEqual(1, writer.add(c.CompactGame.fromGame(self.games[1]).toGame())) # rehydrated games have no checkpoints
+            self.assertEqual(2, writer.add(s.Position.fromGame(self.games[2]).toGame()))
+            self.assertEqual(3, writer.add(g.Game(checkpointInterval=0)))
+        with archive.ArchiveReader(self.path) as reader:
+            self.assertSameGame(self.games[1], reader.load(1))
+
+    def testInvalidFile(self):
+        """Test that files that are not archives are rejected"""
+        with open(self.path, "wb") as f:
+            f.write(b"not an archive" * 4)
+        with self.assertRaises(ValueError):
+            archive.ArchiveReader(self.path)
+
+class TestAnalysis(unittest.TestCase):
+
+    FEN = "4k3/8/8/8/1b6/8/3P4/R3K2R w KQ - 0 1"
+
+    def setUp(self):
+        self.game = notation.fromFen(self.FEN)
+        self.candidates = list(self.game._moves("white", checkEnabled=False))
+
+    def testQueriesDoNotChangeGame(self):
+        """Test that inCheck, causesCheck, and getMoves leave the board unchanged"""
+        self.assertFalse(self.game.inCheck())
+        self.assertFalse(self.game.inCheck("black"))
+        self.assertTrue(self.game.causesCheck(p.Move([(6,3),(5,3)])))
+        pinned = self.game.getSpace((6,3))
+        assert pinned is not None
+        self.assertEqual(2, len(pinned.getMoves(checkEnabled=False)))
+        self.assertEqual(0, len(pinned.getMoves()))
+        self.assertEqual(6, len(self.game.getSpace((7,4)).getMoves())) # type: ignore
+        self.assertTrue(self.game.checkEnabled)
+        self.assertEqual("white", self.game.turn)
+        self.assertEqual(self.FEN, notation.toFen(self.game))
+
+    def testScoreMoves(self):
+        """Test that illegal candidates are flagged and checkmate is found"""
+        scores = analysis.scoreMoves(self.game, self.candidates)
+        self.assertEqual([repr(m) for m in self.candidates], [repr(s.move) for s in scores])
+        illegal = [notation.moveToUci(self.game, s.move) for s in scores if not s.legal]
+        self.assertEqual(["d2d3", "d2d4"], illegal)
+        unreachable = [p.Move([(7,0),(3,4)]), p.Move([(4,1),(5,2)]), p.Move([(7,4),(5,5)]), p.Move([(0,0),(1,0)])] # jump, wrong color, king not in a line, empty space
+        self.assertFalse(any(s.legal for s in analysis.scoreMoves(self.game, unreachable)))
+        attacked = notation.fromFen("4kr2/8/8/8/8/8/8/4K2R w K - 0 1")
+        castle = analysis.scoreMove(attacked, p.Move([(7,4),(7,5),(7,6)], castle="kingside")) # through f1, attacked by the rook on f8
+        self.assertFalse(castle.legal)
+        mated = notation.fromFen("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+        best = max(analysis.scoreMoves(mated, list(mated._moves())), key=lambda s: s.score)
+        self.assertEqual("checkmate", best.status)
+        self.assertEqual("a1a8", notation.moveToUci(mated, best.move))
+
+    def testConcurrentDeterministic(self):
+        """Stress test that scoring from many threads at once gives the same results as scoring one move at a time"""
+        expected = [repr(analysis.scoreMove(self.game, mv, depth=1)) for mv in self.candidates]
+        legal = [repr(m) for m in self.game._moves()]
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6) # switch threads as often as possible to expose any shared state
+        try:
+            for _ in range(3):
+                scores = analysis.scoreMoves(self.game, self.candidates, depth=1, maxWorkers=8)
+                self.assertEqual(expected, [repr(s) for s in scores])
+            with concurrent.futures.ThreadPoolExecutor(8) as pool: # generate legal moves, which looks for check when castling, on the shared game
+                for moves in pool.map(lambda _: [repr(m) for m in self.game._moves()], range(32)):
+                    self.assertEqual(legal, moves)
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(self.FEN, notation.toFen(self.game))
+        self.assertTrue(self.game.checkEnabled)
+
+class TestBuild(unittest.TestCase):
+    def testPerft(self):
+        """Test perft against the known number of positions from the starting position"""
+        self.assertEqual([20, 400, 8902], [benchmark.perft(g.Game(), depth) for depth in (1, 2, 3)])
+
+    def testCopyKeepsType(self):
+        """Test that copies made without type(self) keep the type, color, and hasMoved of every piece"""
+        game = g.Game()
+        game.getSpace((7,0)).hasMoved = True
+        for piece, new in zip(game._pieces(), game._copy()._pieces()):
+            self.assertIs(type(piece), type(new))
+            self.assertEqual((piece.color, piece.pos, piece.hasMoved), (new.color, new.pos, new.hasMoved))
+
+    def testUsePure(self):
+        """Test that usePure loads the source modules even if a compiled build exists"""
+        script = "import build; build.usePure(); import game, pieces; print(game.__file__, pieces.__file__, build.isCompiled(game))"
+        output = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout.split()
+        self.assertEqual(["game.py", "pieces.py", "False"], [os.path.basename(output[0]), os.path.basename(output[1]), output[2]])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,128 @@
+import sys
+import threading
+import time
+from typing import Optional, TextIO
+from game import Game
+from pieces import Move
+from notation import STARTPOS, fromFen, moveFromUci, moveToUci
+from search import MATE, Searcher
+
+class UciEngine:
+    """Answers UCI commands for a Game. Searching runs on a background thread so stop, isready, and quit are answered while it runs"""
+    def __init__(self, output: TextIO = sys.stdout) -> None:
+        self.output = output
+        self.game = fromFen(STARTPOS)
+        self._outputLock = threading.Lock()
+        self._stopEvent = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def send(self, line: str) -> None:
+        """Write one line of output, which may come from either thread"""
+        with self._outputLock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def handle(self, line: str) -> bool:
+        """Execute one command. Return False if the engine should quit"""
+        args = line.split()
+        if len(args) == 0:
+            return True
+        command, args = args[0], args[1:]
+        if command == "uci":
+            self.send("id name Chess-Honors-Project")
+            self.send("id author Matthew Reed-Brown")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.stop()
+            self.game = fromFen(STARTPOS)
+        elif command == "position":
+            self.stop()
+            try:
+                self.game = self._position(args)
+            except ValueError as e:
+                self.send(f"info string {e}")
+        elif command == "go":
+            self.stop()
+            self._go(args)
+        elif command == "stop":
+            self.stop()
+        elif command == "quit":
+            self.stop()
+            return False
+        return True
+
+    def stop(self) -> None:
+        """Stop the current search, if any, and wait for it to report its best move"""
+        if self._thread is not None:
+            self._stopEvent.set()
+            self._thread.join()
+            self._thread = None
+
+    def _position(self, args: list[str]) -> Game:
+        """Return the Game described by the arguments of a position command"""
+        if "moves" in args:
+            split = args.index("moves")
+            args, moves = args[:split], args[split + 1:]
+        else:
+            moves = []
+        if args[:1] == ["startpos"]:
+            game = fromFen(STARTPOS)
+        elif args[:1] == ["fen"]:
+            game = fromFen(" ".join(args[1:]))
+        else:
+            raise ValueError("position needs startpos or fen")
+        for text in moves:
+            game.move(moveFromUci(game, text), evaluate=False)
+        return game
+
+    def _go(self, args: list[str]) -> None:
+        """Start searching in the background with limits from the arguments of a go command"""
+        limits: dict[str, int] = {}
+        for name, value in zip(args, args[1:]):
+            if value.lstrip("-").isdigit():
+                limits[name] = int(value)
+        deadline: Optional[float] = None
+        if "movetime" in limits:
+            deadline = time.monotonic() + limits["movetime"] / 1000
+        elif "wtime" in limits or "btime" in limits:
+            side = "w" if self.game.turn == "white" else "b"
+            remaining = limits.get(f"{side}time", 0)
+            increment = limits.get(f"{side}inc", 0)
+            budget = remaining / limits.get("movestogo", 30) + increment / 2
+            deadline = time.monotonic() + max(0, min(budget, remaining - 50)) / 1000 # keep a margin so the clock never runs out
+        self._stopEvent = threading.Event()
+        searcher = Searcher(self.game._copy(), limits.get("depth", 64), deadline, self._stopEvent, infinite="infinite" in args)
+        searcher.game.checkEnabled = True
+        self._thread = threading.Thread(target=self._search, args=(searcher,), daemon=True)
+        self._thread.start()
+
+    def _search(self, searcher: Searcher) -> None:
+        """Run searcher and report its progress and best move"""
+        def info(depth: int, score: int, nodes: int, elapsed: float, best: Move) -> None:
+            if abs(score) >= MATE - 64:
+                mateIn = (MATE - abs(score) + 1) // 2
+                scoreText = f"mate {mateIn if score > 0 else -mateIn}"
+            else:
+                scoreText = f"cp {score}"
+            nps = int(nodes / elapsed) if elapsed > 0 else 0
+            self.send(f"info depth {depth} score {scoreText} nodes {nodes} nps {nps} time {int(elapsed * 1000)} pv {moveToUci(searcher.game, best)}")
+        best: Optional[Move] = None
+        try:
+            best, _ = searcher.search(info)
+        finally: # a GUI waits for bestmove, so it is sent even if the search fails
+            if searcher.infinite: # infinite searches report only after stop
+                searcher.stopEvent.wait()
+            self.send(f"bestmove {moveToUci(searcher.game, best) if best is not None else '0000'}")
+
+def main(input: TextIO = sys.stdin) -> None:
+    """Read UCI commands from input until quit or end of input"""
+    engine = UciEngine()
+    for line in input:
+        if not engine.handle(line):
+            break
+    engine.stop()
+
+if __name__ == "__main__":
+    main()